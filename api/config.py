@@ -26,6 +26,52 @@ YOU_COM_EXPRESS_URL = os.environ.get(
     "https://api.you.com/v1/agents/runs",
 )
 
+# Shared result cache TTLs in seconds (backend: CACHE_BACKEND, see
+# socratic_questions/cache.py). Generated questions repeat for this long
+# for the same prompt.
+CACHE_TTL_EXPRESS = int(os.environ.get("CACHE_TTL_EXPRESS", "3600"))
+CACHE_TTL_SEARCH = int(os.environ.get("CACHE_TTL_SEARCH", "86400"))
+
+# Sanity (content lake HTTP API used by services)
+SANITY_PROJECT_ID = os.environ.get("SANITY_PROJECT_ID", "s7ui9lek")
+SANITY_DATASET = os.environ.get("SANITY_DATASET", "production")
+SANITY_TOKEN = os.environ.get("SANITY_WRITE_TOKEN")
+SANITY_API_VERSION = os.environ.get("SANITY_API_VERSION", "v2021-06-07")
+# Override to point at a local stub (see loadtest/)
+SANITY_API_URL = os.environ.get("SANITY_API_URL") or f"https://{SANITY_PROJECT_ID}.api.sanity.io"
+
+# /api/question/enhanced builds on /generate over HTTP; set this when the
+# app is not served on localhost:5328 (e.g. gunicorn on another port)
+QUESTION_GENERATE_URL = os.environ.get(
+    "QUESTION_GENERATE_URL",
+    "http://localhost:5328/api/question/generate",
+)
+
+# Spaced repetition: reload a user's due-review index from Sanity after this
+# many seconds so writes from other gunicorn workers are picked up. Each
+# worker holds at most SRS_INDEX_MAX_USERS indexes.
+SRS_INDEX_TTL = int(os.environ.get("SRS_INDEX_TTL", "300"))
+SRS_INDEX_MAX_USERS = int(os.environ.get("SRS_INDEX_MAX_USERS", "256"))
+
+# Neural Trace: reload a user's neuron graph from Sanity after this many
+# seconds; each worker holds at most NEURAL_TRACE_MAX_USERS graphs
+NEURAL_TRACE_TTL = int(os.environ.get("NEURAL_TRACE_TTL", "300"))
+NEURAL_TRACE_MAX_USERS = int(os.environ.get("NEURAL_TRACE_MAX_USERS", "64"))
+
+# HTTP caching: JSON responses at least this large are gzip/br-compressed
+HTTP_COMPRESS_MIN_BYTES = int(os.environ.get("HTTP_COMPRESS_MIN_BYTES", "1024"))
+
+# Per-request profiling (services/profiling.py). Off unless PROFILE_ENABLED;
+# then requests with the header, or a PROFILE_SAMPLE_RATE share of all
+# requests, are profiled into PROFILE_DIR (newest PROFILE_KEEP files kept).
+PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILE_HEADER = os.environ.get("PROFILE_HEADER", "X-Profile")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.environ.get("PROFILE_MODE", "cprofile")  # cprofile | sampling
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", "0.005"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", str(Path(__file__).resolve().parent / ".profiles"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "200"))
+
 # CORS origins for local dev (Next.js)
 CORS_ORIGINS = [
     "http://localhost:3000",
@@ -2,31 +2,48 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 
 # Import your LangGraph
-from socratic_questions import socratic_questions
+from socratic_questions import start_session, resume_session
 
 from routes.question import bp as question_bp
 from routes.answer import bp as answer_bp
 from routes.health import bp as health_bp
 from routes.question_embeddings import bp as question_embeddings_bp
 from routes.answer_sanity import bp as answer_sanity_bp
+from routes.socratic import bp as socratic_bp
+from routes.review import bp as review_bp
+from routes.network import bp as network_bp
+from services import http_cache, profiling
 
 app = Flask(__name__)
 CORS(app)
+http_cache.init_app(app)
+profiling.init_app(app)
 
 app.register_blueprint(question_bp)
 app.register_blueprint(answer_bp)
 app.register_blueprint(health_bp)
 app.register_blueprint(question_embeddings_bp)
 app.register_blueprint(answer_sanity_bp)
+app.register_blueprint(socratic_bp)
+app.register_blueprint(review_bp)
+app.register_blueprint(network_bp)
 
 @app.route("/api/socratic", methods=["POST"])
 def run_tutor():
     try:
         data = request.json 
-        result = socratic_questions.invoke(data)
+        # Runs fetch -> generate and pauses; answer via /api/socratic/answer
+        thread_id, result = start_session(data)
+        if "user_answer" in data or "user_confidence" in data:
+            # Callers of the original one-shot endpoint send the answer up
+            # front: save it right away instead of leaving a paused thread
+            result = resume_session(
+                thread_id, data.get("user_answer", ""), data.get("user_confidence", "")
+            ) or result
         
         return jsonify({
             "question": result.get("socratic_question"),
+            "threadId": thread_id,
             "status": "success"
         })
     except Exception as e:
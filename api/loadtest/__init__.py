@@ -0,0 +1,5 @@
+"""
+Reader-session load generator for sizing gunicorn workers/threads.
+Replays open page -> question -> submit -> save sessions against local
+stubs of You.com, Sanity and Gemini. Run with `python -m loadtest` from api/.
+"""
@@ -0,0 +1,171 @@
+"""
+Run the reader-session load test against gunicorn worker/thread configs.
+
+    cd api && python -m loadtest --configs 1x4,2x4,4x8 --users 40 --duration 60
+
+For each WORKERSxTHREADS config this starts gunicorn (index:app) pointed at
+the local upstream stubs, runs the sessions, stops it, and prints
+throughput, p50/p99 latency and error rate per step. Use --url to load an
+already running server instead (one run, no gunicorn, no stubs: it calls
+whatever upstreams it is configured with).
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from .sessions import STEPS, SessionConfig, run_load
+from .stubs import DEFAULT_LATENCY, StubServer
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float = 30.0, proc: subprocess.Popen | None = None):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {proc.returncode} before {url} was ready")
+        try:
+            if requests.get(f"{url}/api/python", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not become ready in {timeout:.0f}s")
+
+
+def start_gunicorn(workers: int, threads: int, stub_env: dict, workdir: str) -> tuple[subprocess.Popen, str]:
+    """Start gunicorn on a free port with the app pointed at the stubs."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        **stub_env,
+        "QUESTION_GENERATE_URL": f"{url}/api/question/generate",
+        # Keep the dev index, buckets, cache and checkpoints out of the run
+        "LEXICAL_INDEX_PATH": os.path.join(workdir, "lexical_index.db"),
+        "RATE_LIMIT_PATH": os.path.join(workdir, "rate_limits.db"),
+        # A cold cache per config so earlier runs don't warm later ones
+        "CACHE_PATH": os.path.join(workdir, f"cache-{port}.db"),
+        "SOCRATIC_CHECKPOINT_DB": os.path.join(workdir, f"checkpoints-{port}.db"),
+    }
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn",
+            "--workers", str(workers),
+            "--threads", str(threads),
+            "--bind", f"127.0.0.1:{port}",
+            "--timeout", "120",
+            "--log-level", "warning",
+            "index:app",
+        ],
+        cwd=API_DIR,
+        env=env,
+    )
+    try:
+        _wait_ready(url, proc=proc)
+    except Exception:
+        proc.terminate()
+        raise
+    return proc, url
+
+
+def _ms(value) -> str:
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+def print_report(label: str, summary: dict):
+    print(f"\n== {label}: {summary['sessions']} sessions, {summary['sessionThroughput']:.2f} sessions/s")
+    print(f"{'step':<10}{'requests':>10}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>9}")
+    for step in STEPS:
+        s = summary[step]
+        print(
+            f"{step:<10}{s['requests']:>10}{s['throughput']:>9.2f}"
+            f"{_ms(s['p50']):>9}{_ms(s['p99']):>9}{s['errorRate']:>8.1%}"
+        )
+
+
+def _parse_configs(value: str) -> list[tuple[int, int]]:
+    configs = []
+    for item in value.split(","):
+        workers, _, threads = item.strip().partition("x")
+        configs.append((int(workers), int(threads or 1)))
+    return configs
+
+
+def _parse_latency(value: str) -> dict:
+    latency = {}
+    for item in filter(None, value.split(",")):
+        name, _, seconds = item.partition("=")
+        latency[name.strip()] = float(seconds)
+    return latency
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", default="1x4,2x4,4x4",
+                        help="gunicorn WORKERSxTHREADS list (default: %(default)s)")
+    parser.add_argument("--url", help="load an already running server instead of starting gunicorn")
+    parser.add_argument("--users", type=int, default=20, help="concurrent reader sessions")
+    parser.add_argument("--duration", type=float, default=60, help="seconds per config")
+    parser.add_argument("--read-time", type=float, default=5.0, help="mean page reading time (s)")
+    parser.add_argument("--answer-time", type=float, default=10.0, help="mean answer writing time (s)")
+    parser.add_argument("--textbooks", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for textbook/page popularity")
+    parser.add_argument("--latency", default="",
+                        help="stub medians in seconds, e.g. youcom=0.8,sanity=0.08 "
+                             f"(defaults: {','.join(f'{k}={v}' for k, v in DEFAULT_LATENCY.items())})")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of stub calls that fail with 503")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    session_config = SessionConfig(
+        textbooks=args.textbooks,
+        pages=args.pages,
+        skew=args.skew,
+        read_time=args.read_time,
+        answer_time=args.answer_time,
+    )
+    report = {}
+    if args.url:
+        # The target server was started on its own, so it isn't pointed at stubs
+        results, elapsed = run_load(args.url, args.users, args.duration, session_config, args.seed)
+        report[args.url] = results.summary(elapsed)
+        print_report(args.url, report[args.url])
+    else:
+        with StubServer(latency=_parse_latency(args.latency), error_rate=args.error_rate, seed=args.seed) as stubs:
+            with tempfile.TemporaryDirectory() as workdir:
+                for workers, threads in _parse_configs(args.configs):
+                    label = f"{workers} workers x {threads} threads"
+                    proc, url = start_gunicorn(workers, threads, stubs.env(), workdir)
+                    try:
+                        results, elapsed = run_load(url, args.users, args.duration, session_config, args.seed)
+                    finally:
+                        proc.terminate()
+                        proc.wait(30)
+                    report[label] = results.summary(elapsed)
+                    print_report(label, report[label])
+            print(f"\nStub calls: {json.dumps(stubs.counts)}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
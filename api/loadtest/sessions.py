@@ -0,0 +1,190 @@
+"""
+Simulated reader sessions and their latency statistics.
+
+A session opens a page (reading think time), asks for a question
+(/api/question/enhanced), answers it (/api/answer/submit) and saves the
+answer (/api/answer/save-to-sanity), with think time between steps.
+Textbooks and pages are drawn from Zipf distributions so a few books and
+pages take most of the traffic, as in real use.
+"""
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import requests
+
+STEPS = ("question", "submit", "save")
+
+_PASSAGES = [
+    "Cellular respiration converts glucose and oxygen into carbon dioxide, water and ATP.",
+    "Photosynthesis in the chloroplast uses light energy to fix carbon dioxide into sugars.",
+    "Enzymes lower the activation energy of reactions without being consumed by them.",
+    "DNA replication is semi-conservative: each new helix keeps one strand of the original.",
+    "Osmosis moves water across a membrane from low to high solute concentration.",
+]
+_ANSWERS = [
+    "Cells break down glucose in the mitochondria to make ATP for energy.",
+    "Plants capture light in chloroplasts to turn carbon dioxide into sugar.",
+    "It speeds the reaction up by lowering the energy needed to start it.",
+    "I am not sure.",
+]
+_DIFFICULTY_CONFIDENCE = {"easy": 5, "medium": 3, "hard": 1}
+
+
+class Zipf:
+    """Draws ranks 0..n-1 with probability proportional to 1 / (rank + 1) ** s."""
+
+    def __init__(self, n: int, s: float = 1.1):
+        weights = 1.0 / np.arange(1, n + 1) ** s
+        self.cum_weights = np.cumsum(weights).tolist()
+        self.n = n
+
+    def sample(self, rng: random.Random) -> int:
+        return rng.choices(range(self.n), cum_weights=self.cum_weights)[0]
+
+
+@dataclass
+class SessionConfig:
+    textbooks: int = 20
+    pages: int = 300
+    skew: float = 1.1
+    # Mean think times in seconds (exponentially distributed)
+    read_time: float = 5.0
+    answer_time: float = 10.0
+    timeout: float = 60.0
+
+
+@dataclass
+class Results:
+    """Per-step latency samples and error counts, safe to share between threads."""
+
+    latencies: dict = field(default_factory=lambda: {s: [] for s in STEPS})
+    errors: dict = field(default_factory=lambda: {s: 0 for s in STEPS})
+    sessions: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record(self, step: str, seconds: float, ok: bool):
+        with self._lock:
+            self.latencies[step].append(seconds)
+            if not ok:
+                self.errors[step] += 1
+
+    def session_done(self):
+        with self._lock:
+            self.sessions += 1
+
+    def summary(self, elapsed: float) -> dict:
+        """{step: {requests, throughput, p50, p99, errorRate}} plus session totals."""
+        out = {}
+        for step in STEPS:
+            samples = np.array(self.latencies[step])
+            count = len(samples)
+            out[step] = {
+                "requests": count,
+                "throughput": count / elapsed if elapsed else 0.0,
+                "p50": float(np.percentile(samples, 50)) if count else None,
+                "p99": float(np.percentile(samples, 99)) if count else None,
+                "errorRate": self.errors[step] / count if count else 0.0,
+            }
+        out["sessions"] = self.sessions
+        out["sessionThroughput"] = self.sessions / elapsed if elapsed else 0.0
+        return out
+
+
+class ReaderSession:
+    """One simulated reader looping through sessions until `stop` is set."""
+
+    def __init__(self, base_url: str, user: int, config: SessionConfig, results: Results, seed=None):
+        self.base_url = base_url.rstrip("/")
+        self.user_id = f"loadtest-user-{user}"
+        self.config = config
+        self.results = results
+        self.rng = random.Random(seed)
+        self.http = requests.Session()
+        self.books = Zipf(config.textbooks, config.skew)
+        self.pages = Zipf(config.pages, config.skew)
+
+    def _think(self, mean: float, stop: threading.Event):
+        if mean > 0:
+            stop.wait(self.rng.expovariate(1.0 / mean))
+
+    def _post(self, step: str, path: str, body: dict) -> dict | None:
+        started = time.perf_counter()
+        try:
+            resp = self.http.post(self.base_url + path, json=body, timeout=self.config.timeout)
+            ok = resp.status_code == 200
+            data = resp.json() if ok else None
+        except (requests.RequestException, ValueError):
+            ok, data = False, None
+        self.results.record(step, time.perf_counter() - started, ok)
+        return data
+
+    def run_once(self, stop: threading.Event):
+        pdf_id = f"loadtest-textbook-{self.books.sample(self.rng)}"
+        page_number = self.pages.sample(self.rng) + 1
+        passage = self.rng.choice(_PASSAGES)
+
+        self._think(self.config.read_time, stop)
+        if stop.is_set():
+            return
+        question = self._post("question", "/api/question/enhanced", {
+            "pdfId": pdf_id, "pageNumber": page_number, "selectedText": passage,
+        })
+        if question is None or stop.is_set():
+            return
+
+        self._think(self.config.answer_time, stop)
+        if stop.is_set():
+            return
+        answer = self.rng.choice(_ANSWERS)
+        difficulty = self.rng.choice(list(_DIFFICULTY_CONFIDENCE))
+        body = {
+            "pdfId": pdf_id,
+            "pageNumber": page_number,
+            "selectedText": passage,
+            "question": question.get("question", ""),
+            "answer": answer,
+            "difficulty": difficulty,
+        }
+        self._post("submit", "/api/answer/submit", body)
+        self._post("save", "/api/answer/save-to-sanity", {
+            **body,
+            "userId": self.user_id,
+            "confidenceScore": _DIFFICULTY_CONFIDENCE[difficulty],
+        })
+        self.results.session_done()
+
+    def run(self, stop: threading.Event):
+        while not stop.is_set():
+            self.run_once(stop)
+
+
+def run_load(
+    base_url: str,
+    users: int,
+    duration: float,
+    config: SessionConfig | None = None,
+    seed: int | None = None,
+) -> tuple[Results, float]:
+    """Run `users` concurrent readers for `duration` seconds. Returns (results, elapsed)."""
+    config = config or SessionConfig()
+    results = Results()
+    stop = threading.Event()
+    threads = [
+        threading.Thread(
+            target=ReaderSession(base_url, i, config, results, None if seed is None else seed + i).run,
+            args=(stop,),
+            daemon=True,
+        )
+        for i in range(users)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    stop.wait(duration)
+    stop.set()
+    for t in threads:
+        t.join(config.timeout)
+    return results, time.perf_counter() - started
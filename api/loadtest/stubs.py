@@ -0,0 +1,197 @@
+"""
+Local stand-ins for the upstream APIs the app calls, all on one HTTP server:
+
+- You.com search   GET  /v1/search
+- You.com Express  POST /v1/agents/runs
+- Sanity query     GET  /<version>/data/query/<dataset>
+- Sanity mutate    POST /<version>/data/mutate/<dataset>
+- Sanity embeddings POST /vX/embeddings-index/...
+- Gemini           POST /<version>/models/<model>:generateContent
+
+Each upstream answers after a log-normal latency around its configured
+median and fails with 503 at the configured error rate, so runs exercise
+the app's waiting and error paths rather than the network.
+"""
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Median latency in seconds per upstream
+DEFAULT_LATENCY = {"youcom": 0.8, "sanity": 0.08, "embeddings": 0.25, "gemini": 1.0}
+# Spread of the log-normal latency (0 = always the median)
+LATENCY_SIGMA = 0.5
+
+_STUB_TEXT = (
+    "Cells convert glucose into usable energy through cellular respiration, "
+    "which takes place mainly in the mitochondria and produces ATP."
+)
+
+
+def _upstream(method: str, path: str) -> str | None:
+    """Which upstream a request is for, or None if unknown."""
+    if path.startswith("/v1/search") or path.startswith("/v1/agents/runs"):
+        return "youcom"
+    if path.startswith("/vX/embeddings-index"):
+        return "embeddings"
+    if ":generateContent" in path:
+        return "gemini"
+    if "/data/query/" in path or "/data/mutate/" in path:
+        return "sanity"
+    return None
+
+
+def _sanity_query(query: str) -> list:
+    """Documents for fetch_context_documents(); every other query is empty."""
+    match = re.search(r"_id in (\[[^\]]*\])", query or "")
+    if not match:
+        return []
+    return [
+        {
+            "_id": doc_id,
+            "_type": "pageChunk",
+            "pageNumber": 1,
+            "chunkIndex": 0,
+            "charStart": 0,
+            "content": _STUB_TEXT,
+            "textbookTitle": "Load test textbook",
+        }
+        for doc_id in json.loads(match.group(1))
+    ]
+
+
+def _respond(upstream: str, method: str, path: str, query: dict, body: dict):
+    """JSON payload an upstream returns for one request."""
+    if upstream == "youcom" and method == "GET":
+        return {"results": {"web": [
+            {"title": f"Result {i}", "description": _STUB_TEXT, "snippets": [_STUB_TEXT]}
+            for i in range(int((query.get("count") or ["3"])[0]))
+        ]}}
+    if upstream == "youcom":
+        return {"output": [{
+            "type": "message.answer",
+            "text": "What would happen to ATP production if the mitochondria stopped working?",
+        }]}
+    if upstream == "embeddings":
+        k = int(body.get("k") or 3)
+        return [
+            {"score": round(0.9 - 0.05 * i, 3), "value": {"documentId": f"chunk-stub-{i}"}}
+            for i in range(k)
+        ]
+    if upstream == "gemini":
+        return {"candidates": [{
+            "content": {"role": "model", "parts": [{"text": "Why do cells need ATP?"}]},
+            "finishReason": "STOP",
+            "index": 0,
+        }]}
+    if "/data/query/" in path:
+        return {"result": _sanity_query((query.get("query") or [""])[0])}
+    mutations = body.get("mutations") or []
+    return {"transactionId": "stub", "results": [{"operation": "update"} for _ in mutations]}
+
+
+class StubServer:
+    """Threaded stub server; use as a context manager or call start()/stop()."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: dict | None = None,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.latency = {**DEFAULT_LATENCY, **(latency or {})}
+        self.error_rate = error_rate
+        self.counts: dict[str, int] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict:
+        """Environment variables that point the app at this server."""
+        return {
+            "YOU_COM_API_KEY": "loadtest",
+            "YOU_COM_SEARCH_URL": f"{self.url}/v1/search",
+            "YOU_COM_EXPRESS_URL": f"{self.url}/v1/agents/runs",
+            "SANITY_API_URL": self.url,
+            "SANITY_PROJECT_ID": "loadtest",
+            "SANITY_WRITE_TOKEN": "loadtest",
+            "GEMINI_API_ENDPOINT": self.url,
+            "GOOGLE_API_KEY": "loadtest",
+        }
+
+    def _delay(self, upstream: str) -> tuple[float, bool]:
+        with self._lock:
+            self.counts[upstream] = self.counts.get(upstream, 0) + 1
+            median = self.latency.get(upstream, 0.0)
+            delay = self._random.lognormvariate(math.log(median), LATENCY_SIGMA) if median > 0 else 0.0
+            return delay, self._random.random() < self.error_rate
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self, method: str):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                upstream = _upstream(method, parsed.path)
+                if upstream is None:
+                    return self._send(404, {"error": f"No stub for {parsed.path}"})
+                delay, fail = stub._delay(upstream)
+                time.sleep(delay)
+                if fail:
+                    return self._send(503, {"error": "stub failure"})
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    body = {}
+                self._send(200, _respond(upstream, method, parsed.path, parse_qs(parsed.query), body))
+
+            def _send(self, status: int, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
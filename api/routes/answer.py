@@ -1,23 +1,54 @@
 """
-POST /api/answer/submit — Evaluate answer and enrich concepts via You.com.
+POST /api/answer/submit — Evaluate answer (local scoring) and enrich concepts via You.com.
 """
 from flask import Blueprint, request, jsonify
 
 try:
     from services.concepts import extract_concepts
     from services.you_com import search as you_com_search
+    from services.answer_scoring import score_answer
+    from services.http_cache import cache_control, NO_STORE
 except ImportError:
     from api.services.concepts import extract_concepts
     from api.services.you_com import search as you_com_search
+    from api.services.answer_scoring import score_answer
+    from api.services.http_cache import cache_control, NO_STORE
 
 bp = Blueprint("answer", __name__, url_prefix="/api/answer")
 
 
+def _evaluation(scoring: dict | None, difficulty: str) -> str:
+    """Feedback text for a local answer score (None: nothing to score against)."""
+    if scoring is None:
+        return (
+            f"Thanks for your answer! You marked this as '{difficulty}'. "
+            "Keep reflecting on the concepts to strengthen your Neural Trace."
+        )
+    matched = ", ".join(scoring["matchedTerms"][:3])
+    missing = ", ".join(scoring["missingTerms"][:3])
+    if scoring["score"] >= 0.6:
+        feedback = "Strong answer — you engaged with the key ideas of the passage"
+        feedback += f" ({matched})." if matched else "."
+    elif scoring["score"] >= 0.3:
+        feedback = "Good start."
+        if missing:
+            feedback += f" Try connecting your answer to {missing}."
+    else:
+        feedback = "Your answer doesn't engage much with the passage yet."
+        if missing:
+            feedback += f" Revisit how it discusses {missing}."
+    return (
+        f"{feedback} You marked this as '{difficulty}'. "
+        "Keep reflecting on the concepts to strengthen your Neural Trace."
+    )
+
+
 @bp.route("/submit", methods=["POST"])
+@cache_control(NO_STORE)
 def submit():
     """
-    Body: { pdfId, pageNumber, selectedText, question, answer, difficulty }
-    Returns: { evaluation, concepts, enrichment?: [...] }
+    Body: { pdfId, pageNumber, selectedText, question, answer, difficulty, pdfContext? }
+    Returns: { evaluation, score, scoreBreakdown, concepts, enrichment?: [...] }
     """
     data = request.get_json() or {}
     answer = (data.get("answer") or "").strip()
@@ -25,10 +56,13 @@ def submit():
     selected_text = (data.get("selectedText") or "").strip()
 
     concepts = extract_concepts(selected_text + " " + answer, limit=5)
-    evaluation = (
-        f"Your response was marked as '{difficulty}'. "
-        "Keep reflecting on the concepts to strengthen your Neural Trace."
+    scoring = score_answer(
+        answer,
+        selected_text,
+        page_content=data.get("pdfContext") or "",
+        textbook_id=data.get("pdfId"),
     )
+    evaluation = _evaluation(scoring, difficulty)
 
     enrichment = []
     for concept in concepts[:3]:
@@ -51,6 +85,8 @@ def submit():
 
     return jsonify({
         "evaluation": evaluation,
+        "score": scoring["score"] if scoring else None,
+        "scoreBreakdown": scoring,
         "concepts": concepts,
         "enrichment": enrichment,
     })
@@ -3,12 +3,22 @@ import hashlib
 import requests
 from flask import Blueprint, request, jsonify
 
+try:
+    from services import srs, neural_trace
+    from services.answer_scoring import score_answer, score_to_confidence
+    from socratic_questions import rate_limit
+except ImportError:
+    from api.services import srs, neural_trace
+    from api.services.answer_scoring import score_answer, score_to_confidence
+    from api.socratic_questions import rate_limit
+
 bp = Blueprint("answer_sanity", __name__, url_prefix="/api/answer")
 
 # Configuration from Environment
 SANITY_PROJECT_ID = os.getenv("SANITY_PROJECT_ID", "s7ui9lek")
 SANITY_DATASET = os.getenv("SANITY_DATASET", "production")
 SANITY_TOKEN = os.getenv("SANITY_WRITE_TOKEN")
+SANITY_API_URL = os.getenv("SANITY_API_URL") or f"https://{SANITY_PROJECT_ID}.api.sanity.io"
 
 
 @bp.route("/save-to-sanity", methods=["POST"])
@@ -22,7 +32,8 @@ def save_to_sanity():
         "question": "What is Photosynthesis?",
         "answer": "It is how plants make food.",
         "confidenceScore": 5,
-        "selectedText": "Plants use sunlight..."
+        "selectedText": "Plants use sunlight...",
+        "neuronIds": ["optional-neuron-id"]
     }
     """
     data = request.get_json() or {}
@@ -58,6 +69,22 @@ def save_to_sanity():
     if selected_text:
         title += f": {selected_text[:50]}"
 
+    # Local answer score; scheduling uses the mean of self-reported
+    # confidence and the score mapped onto the same 1-5 scale. Without a
+    # passage to score against, the reported confidence is used as is.
+    scoring = score_answer(
+        answer, selected_text, data.get("pdfContext") or "", textbook_id=pdf_id
+    )
+    answer_score = scoring["score"] if scoring else None
+    try:
+        reported_confidence = float(confidence)
+    except (TypeError, ValueError):
+        reported_confidence = 3.0
+    if answer_score is None:
+        effective_confidence = reported_confidence
+    else:
+        effective_confidence = (reported_confidence + score_to_confidence(answer_score)) / 2
+
     # 4. Construct the Sanity Mutation
     # Use createIfNotExists + patch (upsert) instead of createOrReplace to
     # avoid 409 conflicts when concurrent requests target the same document.
@@ -68,6 +95,7 @@ def save_to_sanity():
         "question": question,
         "userResponse": answer,
         "confidenceScore": confidence,
+        **({"answerScore": answer_score} if answer_score is not None else {}),
         "feedback": f"Context: {selected_text[:100]}..."
         if selected_text
         else f"Answered on page {page_number}",
@@ -89,22 +117,47 @@ def save_to_sanity():
         ]
     }
 
-    # 5. Execute the Mutation
+    # 5. Schedule the next review of this page in the same transaction
+    review_item = None
     try:
-        url = f"https://{SANITY_PROJECT_ID}.api.sanity.io/v2021-06-07/data/mutate/{SANITY_DATASET}"
+        srs_mutations, review_item = srs.review_mutations(
+            user_id, srs.mastery_id(user_id, pdf_id, page_number), title, effective_confidence
+        )
+        mutation["mutations"].extend(srs_mutations)
+    except Exception as e:
+        # Scheduling is best-effort; never block saving the answer
+        print(f"SRS scheduling skipped: {e}")
+
+    # 6. Execute the Mutation
+    try:
+        url = f"{SANITY_API_URL}/v2021-06-07/data/mutate/{SANITY_DATASET}"
         headers = {
             "Authorization": f"Bearer {SANITY_TOKEN}",
             "Content-Type": "application/json",
         }
 
-        response = requests.post(url, json=mutation, headers=headers)
+        response = rate_limit.request("sanity_mutate", "POST", url, json=mutation, headers=headers)
         print(f"Sanity response {response.status_code}: {response.text}")
         response.raise_for_status()
 
+        if review_item:
+            srs.commit_review(user_id, review_item)
+
+        # Propagate the mastery change through the user's Neural Trace
+        neuron_ids = list(data.get("neuronIds") or [])
+        if review_item:
+            neuron_ids += review_item["srs"].get("neurons") or []
+        try:
+            neural_trace.apply_answer(user_id, neuron_ids, effective_confidence)
+        except Exception as e:
+            print(f"Neural Trace update skipped: {e}")
+
         return jsonify(
             {
                 "success": True,
                 "documentId": deterministic_id,
+                "answerScore": answer_score,
+                "nextReviewDate": review_item["srs"]["nextReviewDate"] if review_item else None,
                 "message": "Socratic entry saved/updated successfully",
             }
         )
@@ -0,0 +1,73 @@
+"""
+Neural Trace network served from the server-side graph engine.
+
+GET /api/network/neighbourhood — neurons within N synapses of one neuron.
+GET /api/network/subgraph      — the strongest neurons and their synapses.
+"""
+import hashlib
+
+from flask import Blueprint, request, jsonify
+
+try:
+    from services import neural_trace
+    from services.http_cache import cache_control, REVALIDATE
+except ImportError:
+    from api.services import neural_trace
+    from api.services.http_cache import cache_control, REVALIDATE
+
+bp = Blueprint("network", __name__, url_prefix="/api/network")
+
+
+def _graph_etag():
+    """ETag from the graph's state and the query, so unchanged reads skip the view."""
+    user_id = request.args.get("userId")
+    if not user_id:
+        return None
+    graph = neural_trace.get_graph(user_id)
+    key = f"{graph.loaded_at}:{graph.version}:{request.query_string.decode()}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+@bp.route("/neighbourhood", methods=["GET"])
+@cache_control(REVALIDATE, etag=_graph_etag)
+def neighbourhood():
+    """
+    Query: ?userId=...&neuronId=...&depth=1&limit=200
+    Returns: { nodes: [{ id, title, masteryLevel, degree, hops }], links: [{ source, target, strength }] }
+    """
+    try:
+        user_id = request.args.get("userId")
+        neuron_id = request.args.get("neuronId")
+        if not user_id or not neuron_id:
+            return jsonify({"error": "Missing 'userId' or 'neuronId' query parameter"}), 400
+        depth = max(1, min(request.args.get("depth", 1, type=int), 4))
+        limit = max(1, min(request.args.get("limit", 200, type=int), 5000))
+
+        result = neural_trace.get_graph(user_id).neighbourhood(neuron_id, depth, limit)
+        if result is None:
+            return jsonify({"error": f"Neuron '{neuron_id}' not found"}), 404
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/subgraph", methods=["GET"])
+@cache_control(REVALIDATE, etag=_graph_etag)
+def subgraph():
+    """
+    Query: ?userId=...&limit=500
+    Returns: { nodes, links, totalNeurons, totalSynapses }
+    """
+    try:
+        user_id = request.args.get("userId")
+        if not user_id:
+            return jsonify({"error": "Missing 'userId' query parameter"}), 400
+        limit = max(1, min(request.args.get("limit", 500, type=int), 5000))
+
+        graph = neural_trace.get_graph(user_id)
+        result = dict(graph.subgraph(limit))
+        result["totalNeurons"] = len(graph)
+        result["totalSynapses"] = graph.edge_count
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
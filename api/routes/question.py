@@ -1,15 +1,21 @@
 """
 POST /api/question/generate — Socratic question from page/selection.
-Uses You.com Express (LLM) when available; falls back to template.
+Asks the hedged LLM router (You.com Express, then Gemini); falls back to template.
 """
+import hashlib
+
 from flask import Blueprint, request, jsonify
 
 try:
     from services.concepts import extract_concepts
-    from services.you_com import express_ask
+    from socratic_questions import llm_router
+    from socratic_questions.prompt_builder import build_prompt
+    from services.http_cache import cache_control, no_store, REVALIDATE
 except ImportError:
     from api.services.concepts import extract_concepts
-    from api.services.you_com import express_ask
+    from api.socratic_questions import llm_router
+    from api.socratic_questions.prompt_builder import build_prompt
+    from api.services.http_cache import cache_control, no_store, REVALIDATE
 
 bp = Blueprint("question", __name__, url_prefix="/api/question")
 
@@ -33,45 +39,80 @@ def _fallback_question(selected_text: str) -> str:
     )
 
 
+def _question_prompt(data: dict) -> tuple[int, str, bool, str, dict]:
+    """(page_number, selected_text, is_generic, prompt, prompt_metrics) for a /generate body."""
+    page_number = _safe_page_number(data.get("pageNumber"), 1)
+    selected_text = (data.get("selectedText") or "").strip() or "the current content"
+
+    # Only call You.com when we have real passage content (not the generic fallback)
+    is_generic = not selected_text or selected_text in ("active learning", "the current content")
+    if is_generic:
+        # No selection received (e.g. Foxit doesn't expose it). Ask for a varied question by page.
+        prompt, prompt_metrics = build_prompt(
+            f"Generate exactly one short Socratic question for a student reading a textbook. "
+            f"They are on page {page_number}. Vary the question type: sometimes ask to summarize, "
+            "sometimes to connect to prior knowledge, sometimes to compare or apply, sometimes to question assumptions. "
+            "Reply with only the question, no preamble or quotes."
+        )
+    else:
+        # Selection is trimmed to the prompt token budget (PROMPT_TOKEN_BUDGET)
+        prompt, prompt_metrics = build_prompt(
+            "Generate exactly one short Socratic question to help a student think deeper "
+            "about this passage. Ask them to explain, compare, or reflect—do not give answers. "
+            "Reply with only the question, no preamble or quotes.",
+            selection=selected_text,
+            selection_label="Passage:",
+        )
+    return page_number, selected_text, is_generic, prompt, prompt_metrics
+
+
+def cached_question_version(data: dict) -> str | None:
+    """
+    What identifies the /generate response for a body when its answer is
+    already cached, or None (generic prompt, or nothing cached yet).
+    """
+    page_number, _, is_generic, prompt, _ = _question_prompt(data)
+    cached = None if is_generic else llm_router.cached_answer(prompt, "youcom")
+    if not cached:
+        return None
+    return f"{page_number}\0{prompt}\0{cached[0]}\0{cached[1]}"
+
+
+def _question_etag():
+    """ETag from an already cached answer to the same prompt, so repeats skip the view."""
+    version = cached_question_version(request.get_json(silent=True) or {})
+    return hashlib.sha256(version.encode()).hexdigest()[:32] if version else None
+
+
 @bp.route("/generate", methods=["POST"])
+@cache_control(REVALIDATE, etag=_question_etag)
 def generate():
     """
     Body: { pdfId, pageNumber, selectedText }
-    Returns: { question, concepts: [...], anchor: { pageNumber } }
+    Returns: { question, concepts: [...], anchor: { pageNumber }, promptMetrics, llmProvider }
     """
     try:
         data = request.get_json(silent=True) or {}
-        page_number = _safe_page_number(data.get("pageNumber"), 1)
-        selected_text = (data.get("selectedText") or "").strip() or "the current content"
+        page_number, selected_text, is_generic, prompt, prompt_metrics = _question_prompt(data)
+        if is_generic:
+            # A different question every time: nothing to revalidate
+            no_store()
 
         concepts = extract_concepts(selected_text)
         question = _fallback_question(selected_text)
 
-        # Only call You.com when we have real passage content (not the generic fallback)
-        is_generic = not selected_text or selected_text in ("active learning", "the current content")
-        if is_generic:
-            # No selection received (e.g. Foxit doesn't expose it). Ask for a varied question by page.
-            prompt = (
-                f"Generate exactly one short Socratic question for a student reading a textbook. "
-                f"They are on page {page_number}. Vary the question type: sometimes ask to summarize, "
-                "sometimes to connect to prior knowledge, sometimes to compare or apply, sometimes to question assumptions. "
-                "Reply with only the question, no preamble or quotes."
-            )
-        else:
-            prompt = (
-                "Generate exactly one short Socratic question to help a student think deeper "
-                "about this passage. Ask them to explain, compare, or reflect—do not give answers. "
-                "Reply with only the question, no preamble or quotes.\n\nPassage:\n"
-            ) + selected_text[:2000]
-
-        you_answer = express_ask(prompt)
-        if you_answer and len(you_answer.strip()) > 10:
-            question = you_answer.strip()
+        # You.com Express first, hedged to Gemini when it's slow. The generic
+        # prompt asks for a different question each time, so it isn't cached.
+        llm_answer, provider = llm_router.ask(prompt, primary="youcom", cache=not is_generic)
+        if llm_answer:
+            question = llm_answer
 
         return jsonify({
             "question": question,
             "concepts": concepts,
             "anchor": {"pageNumber": page_number},
+            "promptMetrics": prompt_metrics,
+            "llmProvider": provider,
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -4,20 +4,57 @@ Calls /api/question/generate and enhances it.
 
 New endpoint: /api/question/enhanced
 """
+import hashlib
+import json
+
 from flask import Blueprint, request, jsonify
 import requests
 
 try:
-    from services.embeddings_service import get_pdf_context
+    from services.embeddings_service import get_pdf_context, context_query
     from socratic_questions.question_enhancer import should_use_embeddings
+    from socratic_questions.sanity_embeddings import cached_context_chunks
+    from services.http_cache import cache_control, no_store, REVALIDATE
+    from routes.question import cached_question_version
+    from config import QUESTION_GENERATE_URL
 except ImportError:
-    from api.services.embeddings_service import get_pdf_context
+    from api.services.embeddings_service import get_pdf_context, context_query
     from api.socratic_questions.question_enhancer import should_use_embeddings
+    from api.socratic_questions.sanity_embeddings import cached_context_chunks
+    from api.services.http_cache import cache_control, no_store, REVALIDATE
+    from api.routes.question import cached_question_version
+    from api.config import QUESTION_GENERATE_URL
 
 bp = Blueprint("question_embeddings", __name__, url_prefix="/api/question")
 
+GENERIC_SELECTIONS = ("", "active learning", "the current content")
+
+
+def _enhanced_etag():
+    """
+    ETag from the cached question and cached context for this body, so a
+    repeat skips both the LLM and the embeddings round trip; None while
+    either isn't cached yet.
+    """
+    data = request.get_json(silent=True) or {}
+    question = cached_question_version(data)
+    if question is None:
+        return None
+    pdf_id = data.get("pdfId")
+    selected_text = (data.get("selectedText") or "").strip()
+    context = ""
+    if should_use_embeddings(pdf_id, selected_text):
+        chunks = cached_context_chunks(
+            context_query(data.get("pageNumber", 1), selected_text), 3, pdf_id
+        )
+        if chunks is None:
+            return None
+        context = json.dumps(chunks, sort_keys=True, default=str)
+    return hashlib.sha256(f"{question}\0{context}".encode()).hexdigest()[:32]
+
 
 @bp.route("/enhanced", methods=["POST"])
+@cache_control(REVALIDATE, etag=_enhanced_etag)
 def generate_enhanced():
     """
     Enhanced version: calls original /generate and adds embeddings context.
@@ -28,16 +65,19 @@ def generate_enhanced():
         pdf_id = data.get("pdfId")
         page_number = data.get("pageNumber", 1)
         selected_text = data.get("selectedText", "").strip()
+        if selected_text in GENERIC_SELECTIONS:
+            # /generate asks for a different question every time
+            no_store()
 
         # Get embeddings context
         use_embeddings = should_use_embeddings(pdf_id, selected_text)
         pdf_context_result = {"success": False, "context": "", "error": None}
         
         if use_embeddings:
-            pdf_context_result = get_pdf_context(page_number, selected_text, top_k=3)
+            pdf_context_result = get_pdf_context(page_number, selected_text, top_k=3, textbook_id=pdf_id)
 
         original_response = requests.post(
-            "http://localhost:5328/api/question/generate",
+            QUESTION_GENERATE_URL,
             json=data,
             timeout=30
         )
@@ -0,0 +1,74 @@
+"""
+Spaced-repetition review queue.
+
+GET  /api/review/due        — next N due mastery items for a user.
+POST /api/review/reschedule — bulk shift/spread a user's due dates.
+"""
+import hashlib
+import time
+
+from flask import Blueprint, request, jsonify
+
+try:
+    from services import srs
+    from services.http_cache import cache_control, REVALIDATE
+except ImportError:
+    from api.services import srs
+    from api.services.http_cache import cache_control, REVALIDATE
+
+bp = Blueprint("review", __name__, url_prefix="/api/review")
+
+# Items that fall due are picked up by revalidating clients within this many seconds
+DUE_ETAG_WINDOW = 60
+
+
+def _due_etag():
+    """ETag from the index state, the query and the current minute, so unchanged reads skip the view."""
+    user_id = request.args.get("userId")
+    if not user_id:
+        return None
+    index = srs.get_index(user_id)
+    key = f"{index.loaded_at}:{index.version}:{int(time.time() // DUE_ETAG_WINDOW)}:{request.query_string.decode()}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+@bp.route("/due", methods=["GET"])
+@cache_control(REVALIDATE, etag=_due_etag)
+def due():
+    """
+    Query: ?userId=...&limit=10
+    Returns: { items: [{ _id, title, srs }], count, total }
+    """
+    try:
+        user_id = request.args.get("userId")
+        if not user_id:
+            return jsonify({"error": "Missing 'userId' query parameter"}), 400
+        limit = max(1, min(request.args.get("limit", 10, type=int), 100))
+
+        index = srs.get_index(user_id)
+        items = index.due(limit)
+        return jsonify({"items": items, "count": len(items), "total": len(index)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/reschedule", methods=["POST"])
+def reschedule():
+    """
+    Body: { userId, shiftDays?, spreadDays? }
+    Returns: { rescheduled }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        user_id = data.get("userId")
+        if not user_id:
+            return jsonify({"error": "Missing 'userId' in request body"}), 400
+
+        count = srs.reschedule_user(
+            user_id,
+            shift_days=float(data.get("shiftDays") or 0),
+            spread_days=float(data.get("spreadDays") or 0),
+        )
+        return jsonify({"rescheduled": count})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,67 @@
+"""
+Two-phase Socratic flow backed by the LangGraph checkpointer.
+
+POST /api/socratic/start  — fetch page + generate question, pause before save.
+POST /api/socratic/answer — resume a paused thread with the student's answer.
+"""
+from flask import Blueprint, request, jsonify
+
+try:
+    from socratic_questions import start_session, resume_session
+except ImportError:
+    from api.socratic_questions import start_session, resume_session
+
+bp = Blueprint("socratic", __name__, url_prefix="/api/socratic")
+
+
+@bp.route("/start", methods=["POST"])
+def start():
+    """
+    Body: { page_id, page_number?, textbook_id? }
+    Returns: { threadId, question, promptMetrics, status }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if not data.get("page_id"):
+            return jsonify({"error": "Missing 'page_id' in request body"}), 400
+
+        thread_id, state = start_session(data)
+        return jsonify({
+            "threadId": thread_id,
+            "question": state.get("socratic_question"),
+            "promptMetrics": state.get("prompt_metrics"),
+            "status": "awaiting_answer",
+        })
+    except Exception as e:
+        print(f"Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/answer", methods=["POST"])
+def answer():
+    """
+    Body: { threadId, user_answer, user_confidence }
+    Returns: { threadId, question, status }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        thread_id = data.get("threadId")
+        if not thread_id:
+            return jsonify({"error": "Missing 'threadId' in request body"}), 400
+
+        state = resume_session(
+            thread_id,
+            data.get("user_answer", ""),
+            data.get("user_confidence", ""),
+        )
+        if state is None:
+            return jsonify({"error": f"No paused session for thread '{thread_id}'"}), 404
+
+        return jsonify({
+            "threadId": thread_id,
+            "question": state.get("socratic_question"),
+            "status": "success",
+        })
+    except Exception as e:
+        print(f"Error: {e}")
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,130 @@
+"""
+Local answer scoring: compares a student's answer with the passage they
+were asked about, in-process and without an LLM call.
+
+The score (0-1) blends
+- coverage: IDF-weighted share of the passage's key terms the answer uses;
+- similarity: cosine between TF-IDF vectors of answer and passage.
+IDF comes from the local lexical index that retrieval uses, so common
+textbook words count for little; without an index every term weighs 1.
+Answers are only scored against a real passage: with no selection (or the
+placeholder the question route uses for one) and no page content there is
+nothing to compare with, and score_answer() returns None.
+"""
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+try:
+    from socratic_questions import lexical_index
+except ImportError:
+    from api.socratic_questions import lexical_index
+
+# Key terms of the passage checked for coverage
+KEY_TERMS = 10
+# Answers with fewer content words than this are scaled down
+MIN_ANSWER_TERMS = 5
+COVERAGE_WEIGHT = 0.5
+# Passages with fewer distinct content words than this aren't scored
+MIN_REFERENCE_TERMS = 5
+# What routes/question.py asks about when the reader has no selection
+PLACEHOLDER_SELECTIONS = ("active learning", "the current content")
+
+
+def _stem(word: str) -> str:
+    """Very light suffix stripping so 'neurons' matches 'neuron'."""
+    for suffix in ("ations", "ation", "ings", "ing", "ies", "es", "ed", "ly", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[: -len(suffix)]
+    return word
+
+
+def _terms(text: str) -> tuple[Counter, dict[str, str]]:
+    """Stemmed content-word counts, plus one surface form per stem."""
+    counts: Counter = Counter()
+    surface: dict[str, str] = {}
+    for word in re.findall(r"[a-z][a-z0-9]+", (text or "").lower()):
+        if len(word) < 3 or word in lexical_index.STOPWORDS:
+            continue
+        stem = _stem(word)
+        counts[stem] += 1
+        surface.setdefault(stem, word)
+    return counts, surface
+
+
+def _idf(stems: list[str], surface: dict[str, str], textbook_id: str | None) -> dict[str, float]:
+    """Smoothed IDF per stem from the lexical index (1.0 when unavailable)."""
+    frequencies, total = lexical_index.document_frequencies(
+        [surface[s] for s in stems], textbook_id
+    )
+    if not total:
+        return {s: 1.0 for s in stems}
+    return {
+        s: math.log((total + 1) / (frequencies.get(surface[s], 0) + 1)) + 1.0
+        for s in stems
+    }
+
+
+def score_answer(
+    answer: str,
+    selected_text: str = "",
+    page_content: str = "",
+    textbook_id: str | None = None,
+) -> dict | None:
+    """
+    Score an answer against the selected passage (or page content).
+
+    Returns None if there is no real passage to score against, else:
+        {
+            "score": float 0-1,
+            "coverage": float 0-1,
+            "similarity": float 0-1,
+            "matchedTerms": [...],
+            "missingTerms": [...]
+        }
+    """
+    selected_text = (selected_text or "").strip()
+    if selected_text.lower() in PLACEHOLDER_SELECTIONS:
+        selected_text = ""
+    reference = selected_text if len(selected_text.split()) >= 5 else f"{selected_text} {page_content or ''}"
+    reference_counts, reference_surface = _terms(reference)
+    if len(reference_counts) < MIN_REFERENCE_TERMS:
+        return None
+    answer_counts, answer_surface = _terms(answer)
+    if not answer_counts:
+        return {"score": 0.0, "coverage": 0.0, "similarity": 0.0, "matchedTerms": [], "missingTerms": []}
+
+    surface = {**answer_surface, **reference_surface}
+    vocab = sorted(set(answer_counts) | set(reference_counts))
+    idf = _idf(vocab, surface, textbook_id)
+    weights = np.array([idf[t] for t in vocab])
+
+    # TF-IDF vectors (sublinear tf) and their cosine
+    a = np.array([1 + math.log(answer_counts[t]) if answer_counts[t] else 0.0 for t in vocab]) * weights
+    r = np.array([1 + math.log(reference_counts[t]) if reference_counts[t] else 0.0 for t in vocab]) * weights
+    similarity = float(a @ r / (np.linalg.norm(a) * np.linalg.norm(r)))
+
+    # Coverage of the passage's highest-weighted terms
+    key_terms = sorted(reference_counts, key=lambda t: reference_counts[t] * idf[t], reverse=True)[:KEY_TERMS]
+    matched = [t for t in key_terms if t in answer_counts]
+    coverage = sum(idf[t] for t in matched) / sum(idf[t] for t in key_terms)
+
+    score = COVERAGE_WEIGHT * coverage + (1 - COVERAGE_WEIGHT) * similarity
+    answer_terms = sum(answer_counts.values())
+    if answer_terms < MIN_ANSWER_TERMS:
+        score *= answer_terms / MIN_ANSWER_TERMS
+
+    return {
+        "score": round(score, 3),
+        "coverage": round(coverage, 3),
+        "similarity": round(similarity, 3),
+        "matchedTerms": [surface[t] for t in matched],
+        "missingTerms": [surface[t] for t in key_terms if t not in answer_counts],
+    }
+
+
+def score_to_confidence(score: float) -> float:
+    """Map a 0-1 answer score onto the 1-5 confidence scale."""
+    return 1 + 4 * max(0.0, min(1.0, score))
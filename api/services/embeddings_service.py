@@ -12,9 +12,23 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
-def get_pdf_context(page_number: int, selected_text: str = "", top_k: int = 3) -> dict:
+def context_query(page_number: int, selected_text: str = "") -> str:
+    """The embeddings query get_pdf_context() runs for a page/selection."""
+    query_parts = [f"page {page_number}"]
+    if selected_text and selected_text not in ("active learning", "the current content"):
+        query_parts.append(selected_text[:200])
+    return " ".join(query_parts)
+
+
+def get_pdf_context(
+    page_number: int,
+    selected_text: str = "",
+    top_k: int = 3,
+    textbook_id: str = None,
+) -> dict:
     """
-    Get broader PDF context for a given page/text.
+    Get broader PDF context for a given page/text, scoped to textbook_id
+    when given.
     
     Returns:
         {
@@ -24,15 +38,10 @@ def get_pdf_context(page_number: int, selected_text: str = "", top_k: int = 3) -
         }
     """
     try:
-        # Build semantic query
-        query_parts = [f"page {page_number}"]
-        if selected_text and selected_text not in ("active learning", "the current content"):
-            query_parts.append(selected_text[:200])
-        
-        query = " ".join(query_parts)
-        
         # Query embeddings
-        context = get_textbook_context(query, top_k=top_k)
+        context = get_textbook_context(
+            context_query(page_number, selected_text), top_k=top_k, textbook_id=textbook_id
+        )
         
         return {
             "success": True,
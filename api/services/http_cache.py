@@ -0,0 +1,115 @@
+"""
+HTTP caching for API responses: content-hash ETags, If-None-Match -> 304,
+per-route Cache-Control, and gzip/br compression of large JSON bodies.
+
+Routes opt in with @cache_control(policy). A route that can tell cheaply
+whether its answer changed passes etag=callable; a matching If-None-Match
+then returns 304 before the view runs at all. NO_STORE responses get no
+ETag; a view whose answer turns out to vary calls no_store().
+
+Some POST routes are reads (question generation) and take part too. RFC
+9110 only defines 304 for GET/HEAD, so for POST this is a private
+contract with lib/neural-trace-api.ts: it sends If-None-Match itself and
+reads a 304 as "reuse your copy". Browsers and proxies don't cache POST
+responses, so nothing else relies on it.
+"""
+import functools
+import gzip
+import hashlib
+import logging
+
+from flask import g, request
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+try:
+    from config import HTTP_COMPRESS_MIN_BYTES
+except ImportError:
+    from api.config import HTTP_COMPRESS_MIN_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Header-only revalidation: clients may keep the body but must check first
+REVALIDATE = "private, no-cache"
+# Never kept: answers that differ on every call or carry what the student wrote
+NO_STORE = "no-store"
+
+
+def cache_control(policy: str, etag=None):
+    """
+    Mark a view's successful responses cacheable with the given
+    Cache-Control policy and an ETag. `etag`, if given, is called before
+    the view and returns a version string (or None to fall back to hashing
+    the response body).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            g.cache_policy = policy
+            g.etag = None
+            if etag is not None:
+                try:
+                    g.etag = etag()
+                except Exception as e:
+                    # The view reports the real failure; just skip the shortcut
+                    logger.warning(f"ETag precheck failed: {e}")
+            if g.etag and request.if_none_match.contains_weak(g.etag):
+                return "", 304
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def no_store():
+    """Send the current response as NO_STORE (and without an ETag)."""
+    g.cache_policy = NO_STORE
+
+
+def _compress(response):
+    if (
+        response.direct_passthrough
+        or response.status_code != 200
+        or response.mimetype != "application/json"
+        or "Content-Encoding" in response.headers
+    ):
+        return
+    data = response.get_data()
+    if len(data) < HTTP_COMPRESS_MIN_BYTES:
+        return
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        response.set_data(brotli.compress(data, quality=5))
+        response.headers["Content-Encoding"] = "br"
+    elif accepted["gzip"]:
+        response.set_data(gzip.compress(data, compresslevel=6))
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        return
+    response.vary.add("Accept-Encoding")
+
+
+def _finalize(response):
+    policy = g.get("cache_policy")
+    if policy == NO_STORE:
+        response.headers["Cache-Control"] = policy
+    elif policy and response.status_code in (200, 304):
+        response.headers["Cache-Control"] = policy
+        tag = g.get("etag")
+        if response.status_code == 200 and not response.direct_passthrough:
+            tag = tag or hashlib.sha256(response.get_data()).hexdigest()[:32]
+            if request.if_none_match.contains_weak(tag):
+                response.status_code = 304
+                response.set_data(b"")
+        if tag:
+            # Weak: the same tag covers gzip, br and identity encodings
+            response.set_etag(tag, weak=True)
+    _compress(response)
+    return response
+
+
+def init_app(app):
+    """Register the caching/compression hook on the Flask app."""
+    app.after_request(_finalize)
@@ -0,0 +1,266 @@
+"""
+Neural Trace graph engine: a user's neurons and synapses held server-side.
+
+Synapses are stored as an undirected CSR adjacency (indptr/indices numpy
+arrays) so neighbourhood queries touch only the rows they need, even for
+10k+ neurons. Mastery changes from saved answers propagate along synapses
+with per-hop decay, and neighbourhood/subgraph payloads are cached (up to
+PAYLOAD_CACHE_SIZE per graph) until the graph changes. Graphs are kept per
+worker in a bounded UserCache (NEURAL_TRACE_MAX_USERS, NEURAL_TRACE_TTL).
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import requests
+
+try:
+    from services import sanity_api
+    from services.user_cache import UserCache
+    from config import NEURAL_TRACE_TTL, NEURAL_TRACE_MAX_USERS
+except ImportError:
+    from api.services import sanity_api
+    from api.services.user_cache import UserCache
+    from api.config import NEURAL_TRACE_TTL, NEURAL_TRACE_MAX_USERS
+
+logger = logging.getLogger(__name__)
+
+# Share of a mastery change passed on to each further hop
+PROPAGATION_DECAY = 0.5
+PROPAGATION_HOPS = 2
+# Mastery points per confidence step away from neutral (3) on a 1-5 scale
+MASTERY_STEP = 5.0
+# Neighbourhood/subgraph payloads kept per graph, least recently used out first
+PAYLOAD_CACHE_SIZE = 64
+# Tries when a neuron changes between reading and writing its level
+MUTATE_ATTEMPTS = 3
+
+_NEURONS_QUERY = (
+    '*[_type == "neuron" && (user._ref == $userId || user->userId == $userId || isDemo == true)]'
+    '{_id, title, masteryLevel, isDemo, "synapses": synapses[]._ref}'
+)
+_LEVELS_QUERY = '*[_type == "neuron" && _id in $ids]{_id, _rev, masteryLevel}'
+
+
+class NeuronGraph:
+    """CSR adjacency plus per-node mastery for one user's network."""
+
+    def __init__(self, neurons: list[dict]):
+        self.ids = [n["_id"] for n in neurons]
+        self.titles = [n.get("title") or "" for n in neurons]
+        self.index = {neuron_id: i for i, neuron_id in enumerate(self.ids)}
+        self.mastery = np.array(
+            [float(n.get("masteryLevel") or 0) for n in neurons], dtype=np.float32
+        )
+        # Demo neurons are shared by every user and never modified
+        self.is_demo = np.array([bool(n.get("isDemo")) for n in neurons], dtype=bool)
+        self.loaded_at = time.time()
+        # Bumped on every mastery change; (loaded_at, version) identifies a state
+        self.version = 0
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[tuple, dict]" = OrderedDict()
+
+        src, dst = [], []
+        for i, n in enumerate(neurons):
+            for ref in n.get("synapses") or []:
+                j = self.index.get(ref)
+                if j is not None and j != i:
+                    src.append(i)
+                    dst.append(j)
+        self._build_csr(np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64))
+
+    def _build_csr(self, src: np.ndarray, dst: np.ndarray):
+        n = len(self.ids)
+        # Synapses are shown undirected: store both directions once each
+        keys = np.unique(np.concatenate([src * n + dst, dst * n + src]))
+        rows, cols = keys // n, keys % n
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=self.indptr[1:])
+        self.indices = cols.astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices) // 2
+
+    def _expand(self, frontier: np.ndarray) -> np.ndarray:
+        """All neighbours of the frontier nodes, gathered without a Python loop."""
+        starts = self.indptr[frontier]
+        lengths = self.indptr[frontier + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int32)
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.indices[offsets + np.arange(total)]
+
+    def _bfs(self, start: int, depth: int, limit: int) -> tuple[np.ndarray, np.ndarray]:
+        """Nodes within `depth` hops of start (at most `limit`) and their hop counts."""
+        hops = np.full(len(self.ids), -1, dtype=np.int32)
+        hops[start] = 0
+        frontier = np.array([start], dtype=np.int64)
+        found = [frontier]
+        count = 1
+        for hop in range(1, depth + 1):
+            if not frontier.size or count >= limit:
+                break
+            neighbours = np.unique(self._expand(frontier))
+            frontier = neighbours[hops[neighbours] < 0][: limit - count].astype(np.int64)
+            hops[frontier] = hop
+            found.append(frontier)
+            count += frontier.size
+        nodes = np.concatenate(found)
+        return nodes, hops[nodes]
+
+    def _payload(self, nodes: np.ndarray, hops: np.ndarray | None = None) -> dict:
+        """Nodes plus the synapses among them, with precomputed link strength."""
+        mask = np.zeros(len(self.ids), dtype=bool)
+        mask[nodes] = True
+        links = []
+        for i in nodes.tolist():
+            for j in self.indices[self.indptr[i]:self.indptr[i + 1]].tolist():
+                if i < j and mask[j]:
+                    links.append({
+                        "source": self.ids[i],
+                        "target": self.ids[j],
+                        "strength": round(float(self.mastery[i] + self.mastery[j]) / 200, 3),
+                    })
+        out_nodes = []
+        for k, i in enumerate(nodes.tolist()):
+            node = {
+                "id": self.ids[i],
+                "title": self.titles[i],
+                "masteryLevel": round(float(self.mastery[i]), 2),
+                "degree": int(self.indptr[i + 1] - self.indptr[i]),
+            }
+            if hops is not None:
+                node["hops"] = int(hops[k])
+            out_nodes.append(node)
+        return {"nodes": out_nodes, "links": links}
+
+    def neighbourhood(self, neuron_id: str, depth: int = 1, limit: int = 200) -> dict | None:
+        """Neurons within `depth` synapses of neuron_id, or None if unknown."""
+        start = self.index.get(neuron_id)
+        if start is None:
+            return None
+        def build():
+            nodes, hops = self._bfs(start, depth, limit)
+            return self._payload(nodes, hops)
+        return self._cached(("neighbourhood", neuron_id, depth, limit), build)
+
+    def subgraph(self, limit: int = 500) -> dict:
+        """The `limit` strongest neurons (by mastery, then degree) and their synapses."""
+        def build():
+            degree = np.diff(self.indptr)
+            return self._payload(np.lexsort((-degree, -self.mastery))[:limit])
+        return self._cached(("subgraph", limit), build)
+
+    def _cached(self, key: tuple, build) -> dict:
+        """Payload for key from the per-graph LRU, built under the lock on a miss."""
+        with self._lock:
+            payload = self._cache.get(key)
+            if payload is None:
+                payload = self._cache[key] = build()
+                while len(self._cache) > PAYLOAD_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache.move_to_end(key)
+            return payload
+
+    def spread(
+        self,
+        neuron_ids: list[str],
+        delta: float,
+        decay: float = PROPAGATION_DECAY,
+        max_hops: int = PROPAGATION_HOPS,
+    ) -> dict[str, float]:
+        """
+        Mastery change per neuron when each of neuron_ids changes by delta
+        and a decayed share reaches neurons up to max_hops away (demo
+        neurons pass it on but keep their level). Nothing is applied.
+        Returns {neuron_id: change}.
+        """
+        total = np.zeros(len(self.ids), dtype=np.float64)
+        for neuron_id in dict.fromkeys(neuron_ids):
+            start = self.index.get(neuron_id)
+            if start is None or not delta:
+                continue
+            nodes, hops = self._bfs(start, max_hops, len(self.ids))
+            total[nodes] += delta * decay ** hops
+        total[self.is_demo] = 0
+        return {self.ids[i]: float(total[i]) for i in np.flatnonzero(total).tolist()}
+
+    def set_levels(self, levels: dict[str, float]):
+        """Record mastery levels that have been written to Sanity."""
+        with self._lock:
+            for neuron_id, level in levels.items():
+                i = self.index.get(neuron_id)
+                if i is not None:
+                    self.mastery[i] = level
+            if levels:
+                self.version += 1
+                self._cache.clear()
+
+
+def load_neurons(user_id: str) -> list[dict]:
+    """A user's neurons (plus demo neurons) with synapse ids."""
+    return sanity_api.query(_NEURONS_QUERY, {"userId": user_id}) or []
+
+
+_graphs: UserCache[NeuronGraph] = UserCache(
+    lambda user_id: NeuronGraph(load_neurons(user_id)), NEURAL_TRACE_TTL, NEURAL_TRACE_MAX_USERS
+)
+
+
+def get_graph(user_id: str, refresh: bool = False) -> NeuronGraph:
+    """The user's NeuronGraph, reloaded from Sanity after NEURAL_TRACE_TTL seconds."""
+    return _graphs.get(user_id, refresh)
+
+
+def apply_answer(user_id: str, neuron_ids: list[str], confidence) -> dict[str, float]:
+    """
+    Propagate the mastery change from one answered question through the
+    user's network and write changed levels back to Sanity.
+    Returns {neuron_id: new masteryLevel}.
+
+    Only the graph's structure comes from the (possibly stale) cached
+    graph; levels are read fresh and written with ifRevisionID, so a
+    concurrent update from another worker makes this retry instead of
+    being overwritten. The cached graph changes only after the write.
+    """
+    delta = (float(confidence) - 3) * MASTERY_STEP
+    if not neuron_ids or not delta:
+        return {}
+    graph = get_graph(user_id)
+    changes = graph.spread(neuron_ids, delta)
+    if not changes:
+        return {}
+    for attempt in range(MUTATE_ATTEMPTS):
+        current = sanity_api.query(_LEVELS_QUERY, {"ids": list(changes)}) or []
+        changed: dict[str, float] = {}
+        patches = []
+        for doc in current:
+            if doc.get("_id") not in changes:
+                continue
+            before = float(doc.get("masteryLevel") or 0)
+            level = round(min(max(before + changes[doc["_id"]], 0.0), 100.0), 2)
+            if level != before:
+                changed[doc["_id"]] = level
+                patches.append({
+                    "patch": {"id": doc["_id"], "ifRevisionID": doc["_rev"], "set": {"masteryLevel": level}}
+                })
+        if not patches:
+            return {}
+        try:
+            sanity_api.mutate(patches)
+        except requests.HTTPError as e:
+            # 409: a neuron changed since it was read
+            if e.response is None or e.response.status_code != 409 or attempt == MUTATE_ATTEMPTS - 1:
+                raise
+            continue
+        graph.set_levels(changed)
+        return changed
+    return {}
@@ -0,0 +1,255 @@
+"""
+Opt-in per-request profiling.
+
+With PROFILE_ENABLED set, a request is profiled when it carries the
+PROFILE_HEADER header or is picked at PROFILE_SAMPLE_RATE. The profile is
+written to PROFILE_DIR (newest PROFILE_KEEP files are kept):
+- "cprofile": deterministic cProfile, saved as .pstats (snakeviz, pstats);
+- "sampling": stacks of the request thread read via sys._current_frames()
+  every PROFILE_SAMPLE_INTERVAL seconds, saved as .speedscope.json.
+The header value may name the mode per request. When disabled, init_app()
+installs nothing, so requests pay no cost.
+
+cProfile is process-wide on Python 3.12+ (it is built on sys.monitoring),
+so one .pstats file also records whatever other threads run meanwhile; it
+is only a per-request profile with one thread per worker. Only one
+cProfile runs per process at a time: a request that asks for one while
+another is running is sampled instead.
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+try:
+    from config import (
+        PROFILE_ENABLED,
+        PROFILE_HEADER,
+        PROFILE_SAMPLE_RATE,
+        PROFILE_MODE,
+        PROFILE_SAMPLE_INTERVAL,
+        PROFILE_DIR,
+        PROFILE_KEEP,
+    )
+except ImportError:
+    from api.config import (
+        PROFILE_ENABLED,
+        PROFILE_HEADER,
+        PROFILE_SAMPLE_RATE,
+        PROFILE_MODE,
+        PROFILE_SAMPLE_INTERVAL,
+        PROFILE_DIR,
+        PROFILE_KEEP,
+    )
+
+logger = logging.getLogger(__name__)
+
+MODES = ("cprofile", "sampling")
+
+_rotate_lock = threading.Lock()
+# Held while a cProfile is enabled (only one can run per process)
+_cprofile_lock = threading.Lock()
+
+
+class _ProfilerBusy(Exception):
+    """cProfile could not be enabled."""
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        # stack -> seconds attributed to it
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if self._stop.is_set():
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                # Weight by wall time since the last sample: a busy request
+                # thread holds the GIL and delays samples past the interval
+                self.stacks[tuple(reversed(stack))] += now - last
+            last = now
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def speedscope(self, name: str, duration: float) -> dict:
+        """The samples in speedscope's "sampled" file format."""
+        frames, frame_index, samples, weights = [], {}, [], []
+        for stack, seconds in self.stacks.items():
+            indexes = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indexes.append(frame_index[frame])
+            samples.append(indexes)
+            weights.append(seconds)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": duration,
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": name,
+        }
+
+
+def _profile_name(environ) -> str:
+    path = re.sub(r"[^A-Za-z0-9]+", "-", environ.get("PATH_INFO", "")).strip("-") or "root"
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return f"{stamp}-{int(time.time() * 1000) % 1000:03d}-{environ.get('REQUEST_METHOD', 'GET')}-{path}"
+
+
+def _rotate(directory: str, keep: int):
+    """Delete all but the newest `keep` profile files."""
+    with _rotate_lock:
+        try:
+            files = [os.path.join(directory, f) for f in os.listdir(directory)]
+            files.sort(key=os.path.getmtime, reverse=True)
+            for old in files[keep:]:
+                os.remove(old)
+        except OSError as e:
+            logger.warning(f"Profile rotation failed: {e}")
+
+
+class ProfilingMiddleware:
+    """WSGI middleware that profiles selected requests."""
+
+    def __init__(
+        self,
+        wsgi_app,
+        directory: str = PROFILE_DIR,
+        header: str = PROFILE_HEADER,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        mode: str = PROFILE_MODE,
+        keep: int = PROFILE_KEEP,
+    ):
+        self.wsgi_app = wsgi_app
+        self.directory = directory
+        self.header_key = "HTTP_" + header.upper().replace("-", "_")
+        self.sample_rate = sample_rate
+        self.mode = mode if mode in MODES else "cprofile"
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    def _selected_mode(self, environ) -> str | None:
+        requested = environ.get(self.header_key)
+        if requested is not None:
+            return requested.strip().lower() if requested.strip().lower() in MODES else self.mode
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return self.mode
+        return None
+
+    def __call__(self, environ, start_response):
+        mode = self._selected_mode(environ)
+        if mode is None:
+            return self.wsgi_app(environ, start_response)
+
+        name = _profile_name(environ)
+
+        def profiled_start_response(status, headers, exc_info=None):
+            headers.append(("X-Profile-Id", name))
+            return start_response(status, headers, exc_info)
+
+        started = time.perf_counter()
+        if mode == "cprofile":
+            if _cprofile_lock.acquire(blocking=False):
+                try:
+                    return self._cprofile(environ, profiled_start_response, name, started)
+                except _ProfilerBusy:
+                    pass
+                finally:
+                    _cprofile_lock.release()
+            logger.info(f"cProfile busy in this process; sampling {name} instead")
+
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+        try:
+            body = _consume(self.wsgi_app(environ, profiled_start_response))
+        finally:
+            sampler.stop()
+            duration = time.perf_counter() - started
+            profile = sampler.speedscope(name, duration)
+            self._save(name, ".speedscope.json", lambda path: _write_json(path, profile), started)
+        return body
+
+    def _cprofile(self, environ, start_response, name: str, started: float):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Another profiling tool (debugger, coverage) holds the hooks
+            raise _ProfilerBusy() from e
+        try:
+            # Flask buffers the body, so consuming it here keeps the
+            # whole handler inside the profile
+            body = _consume(self.wsgi_app(environ, start_response))
+        finally:
+            profiler.disable()
+            self._save(name, ".pstats", lambda path: profiler.dump_stats(path), started)
+        return body
+
+    def _save(self, name: str, suffix: str, write, started: float):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        path = os.path.join(self.directory, f"{name}-{elapsed_ms:.0f}ms{suffix}")
+        try:
+            write(path)
+            logger.info(f"Profile written: {path}")
+        except OSError as e:
+            logger.warning(f"Could not write profile {path}: {e}")
+            return
+        _rotate(self.directory, self.keep)
+
+
+def _consume(iterable) -> list:
+    """Read a WSGI response body, then close it (runs Flask's teardown) as servers must."""
+    try:
+        return list(iterable)
+    finally:
+        close = getattr(iterable, "close", None)
+        if close is not None:
+            close()
+
+
+def _write_json(path: str, data: dict):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def init_app(app):
+    """Wrap the app in ProfilingMiddleware when PROFILE_ENABLED is set."""
+    if not PROFILE_ENABLED:
+        return
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app)
+    logger.info(f"Request profiling on ({PROFILE_MODE}); profiles go to {PROFILE_DIR}")
@@ -0,0 +1,72 @@
+"""
+Minimal Sanity HTTP API client for services: GROQ queries and mutations.
+"""
+import json
+
+try:
+    from api.config import (
+        SANITY_DATASET,
+        SANITY_TOKEN,
+        SANITY_API_VERSION,
+        SANITY_API_URL,
+    )
+except ImportError:
+    from config import (
+        SANITY_DATASET,
+        SANITY_TOKEN,
+        SANITY_API_VERSION,
+        SANITY_API_URL,
+    )
+
+try:
+    from api.socratic_questions import rate_limit
+except ImportError:
+    from socratic_questions import rate_limit
+
+
+def _base_url() -> str:
+    return f"{SANITY_API_URL}/{SANITY_API_VERSION}/data"
+
+
+def _headers() -> dict:
+    return {
+        "Authorization": f"Bearer {SANITY_TOKEN}",
+        "Content-Type": "application/json",
+    }
+
+
+def query(groq: str, params: dict | None = None, timeout: int = 10):
+    """
+    Run a GROQ query; params become $variables. Returns the `result` value.
+    Raises requests.HTTPError on a non-2xx response.
+    """
+    query_params = {"query": groq}
+    for name, value in (params or {}).items():
+        query_params[f"${name}"] = json.dumps(value)
+    resp = rate_limit.request(
+        "sanity_query",
+        "GET",
+        f"{_base_url()}/query/{SANITY_DATASET}",
+        params=query_params,
+        headers=_headers(),
+        timeout=timeout,
+    )
+    resp.raise_for_status()
+    return resp.json().get("result")
+
+
+def mutate(mutations: list[dict], timeout: int = 10) -> dict:
+    """
+    Apply mutations in one transaction. Returns the response body.
+    Raises requests.HTTPError on a non-2xx response.
+    """
+    resp = rate_limit.request(
+        "sanity_mutate",
+        "POST",
+        f"{_base_url()}/mutate/{SANITY_DATASET}",
+        json={"mutations": mutations},
+        headers=_headers(),
+        timeout=timeout,
+    )
+    resp.raise_for_status()
+    return resp.json()
@@ -0,0 +1,258 @@
+"""
+Spaced-repetition scheduling for `mastery` documents.
+
+Intervals follow a simplified SM-2: a review with confidence (1-5) below
+PASS_CONFIDENCE resets the interval to one day; otherwise it grows 1 -> 3 ->
+interval * ease, where ease rises with confidence. Each user's items live in
+a ReviewIndex, a min-heap on nextReviewDate, so due items are served in
+O(log n) each without re-reading everything from Sanity.
+"""
+import hashlib
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    from services import sanity_api
+    from services.user_cache import UserCache
+    from config import SRS_INDEX_TTL, SRS_INDEX_MAX_USERS
+except ImportError:
+    from api.services import sanity_api
+    from api.services.user_cache import UserCache
+    from api.config import SRS_INDEX_TTL, SRS_INDEX_MAX_USERS
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400.0
+# Reviews below this confidence start the item over
+PASS_CONFIDENCE = 3
+MAX_INTERVAL_DAYS = 365
+
+_MASTERY_FIELDS = '{_id, title, srs{lastReviewed, nextReviewDate, confidence, interval, "neurons": neurons[]._ref}}'
+_MASTERY_QUERY = (
+    '*[_type == "mastery" && (user._ref == $userId || user->userId == $userId)]' + _MASTERY_FIELDS
+)
+_MASTERY_ITEM_QUERY = '*[_type == "mastery" && _id == $id][0]' + _MASTERY_FIELDS
+
+
+def _to_ts(value) -> float:
+    """ISO datetime -> epoch seconds; missing dates count as due now (0)."""
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _to_iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def mastery_id(user_id: str, pdf_id: str, page_number) -> str:
+    """Deterministic mastery document id for one user/textbook/page."""
+    digest = hashlib.md5(f"{user_id}-{pdf_id}-{page_number}".encode()).hexdigest()
+    return f"mastery-{digest}"
+
+
+def next_intervals(intervals, confidences) -> np.ndarray:
+    """Next interval in days for each item, given its current interval and review confidence."""
+    intervals = np.asarray(intervals, dtype=np.float64)
+    confidences = np.clip(np.asarray(confidences, dtype=np.float64), 1, 5)
+    ease = 1.3 + 0.3 * (confidences - 1)
+    grown = np.where(
+        intervals < 1, 1.0,
+        np.where(intervals < 3, 3.0, np.round(intervals * ease)),
+    )
+    return np.minimum(np.where(confidences < PASS_CONFIDENCE, 1.0, grown), MAX_INTERVAL_DAYS)
+
+
+def schedule(srs: dict | None, confidence, now: float | None = None) -> dict:
+    """SRS state for one item after a review with the given confidence."""
+    now = time.time() if now is None else now
+    interval = float((srs or {}).get("interval") or 0)
+    days = float(next_intervals([interval], [confidence])[0])
+    return {
+        "lastReviewed": _to_iso(now),
+        "nextReviewDate": _to_iso(now + days * DAY),
+        "confidence": int(round(float(confidence))),
+        "interval": int(days),
+    }
+
+
+class ReviewIndex:
+    """
+    Min-heap of (next_review_ts, item_id) over one user's mastery items.
+    Updates push a new entry and leave the old one to be skipped lazily.
+    """
+
+    def __init__(self, items=()):
+        self.items: dict[str, dict] = {}
+        self._due_at: dict[str, float] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self.loaded_at = time.time()
+        # Bumped on every change; (loaded_at, version) identifies a state
+        self.version = 0
+        for item in items:
+            self.items[item["_id"]] = item
+            self._due_at[item["_id"]] = _to_ts((item.get("srs") or {}).get("nextReviewDate"))
+        self._rebuild()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _rebuild(self):
+        self._heap = [(ts, item_id) for item_id, ts in self._due_at.items()]
+        heapq.heapify(self._heap)
+
+    def upsert(self, item: dict):
+        """Add or update an item. O(log n)."""
+        ts = _to_ts((item.get("srs") or {}).get("nextReviewDate"))
+        with self._lock:
+            self.items[item["_id"]] = item
+            self._due_at[item["_id"]] = ts
+            heapq.heappush(self._heap, (ts, item["_id"]))
+            self.version += 1
+
+    def due(self, limit: int = 10, now: float | None = None) -> list[dict]:
+        """Up to `limit` items due at `now`, most overdue first. O(limit log n)."""
+        now = time.time() if now is None else now
+        out, popped = [], []
+        with self._lock:
+            while self._heap and len(out) < limit:
+                ts, item_id = self._heap[0]
+                if self._due_at.get(item_id) != ts:
+                    heapq.heappop(self._heap)  # stale entry
+                    continue
+                if ts > now:
+                    break
+                popped.append(heapq.heappop(self._heap))
+                out.append(self.items[item_id])
+            for entry in popped:
+                heapq.heappush(self._heap, entry)
+        return out
+
+    def reschedule(
+        self,
+        shift_days: float = 0.0,
+        spread_days: float = 0.0,
+        now: float | None = None,
+    ) -> dict[str, float]:
+        """
+        Bulk-reschedule every item at once (vectorized):
+        - shift_days moves all due dates by that many days;
+        - spread_days spreads overdue items evenly over the next N days,
+          most overdue first, so a backlog doesn't land on one day.
+        Returns {item_id: new_ts} for items that changed. O(n log n).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            ids = list(self._due_at)
+            if not ids:
+                return {}
+            old = np.fromiter((self._due_at[i] for i in ids), dtype=np.float64, count=len(ids))
+            new = old + shift_days * DAY
+
+            if spread_days > 0:
+                overdue = np.flatnonzero(new <= now)
+                if overdue.size:
+                    order = overdue[np.argsort(new[overdue], kind="stable")]
+                    step = spread_days * DAY / overdue.size
+                    new[order] = now + np.arange(overdue.size) * step
+
+            changed = np.flatnonzero(new != old)
+            updates = {ids[i]: float(new[i]) for i in changed}
+            for item_id, ts in updates.items():
+                self._due_at[item_id] = ts
+                item = self.items[item_id]
+                srs = item.get("srs") or {}
+                srs["nextReviewDate"] = _to_iso(ts)
+                item["srs"] = srs
+            self._rebuild()
+            if updates:
+                self.version += 1
+        return updates
+
+
+def load_items(user_id: str) -> list[dict]:
+    """All mastery items for a user (by Sanity user _id or Clerk id)."""
+    return sanity_api.query(_MASTERY_QUERY, {"userId": user_id}) or []
+
+
+def load_item(item_id: str) -> dict | None:
+    """One mastery item as it is in Sanity now, or None if it doesn't exist yet."""
+    return sanity_api.query(_MASTERY_ITEM_QUERY, {"id": item_id})
+
+
+_indexes: UserCache[ReviewIndex] = UserCache(
+    lambda user_id: ReviewIndex(load_items(user_id)), SRS_INDEX_TTL, SRS_INDEX_MAX_USERS
+)
+
+
+def get_index(user_id: str, refresh: bool = False) -> ReviewIndex:
+    """The user's ReviewIndex, reloaded from Sanity after SRS_INDEX_TTL seconds."""
+    return _indexes.get(user_id, refresh)
+
+
+def review_mutations(
+    user_id: str,
+    item_id: str,
+    title: str,
+    confidence,
+    now: float | None = None,
+) -> tuple[list[dict], dict]:
+    """
+    Mutations that upsert a mastery item with its next SRS state, plus the
+    item to pass to commit_review() once they have been applied.
+    """
+    # Schedule from the stored item: another worker may have reviewed it
+    # since this worker's index was loaded
+    try:
+        previous = load_item(item_id) or {}
+    except Exception as e:
+        logger.warning(f"Could not load mastery item {item_id}, using the cached copy: {e}")
+        previous = get_index(user_id).items.get(item_id) or {}
+    srs = schedule(previous.get("srs"), confidence, now)
+    # The index copy keeps fields the mutation leaves alone (srs.neurons)
+    item = {"_id": item_id, "title": title, "srs": {**(previous.get("srs") or {}), **srs}}
+    mutations = [
+        {
+            "createIfNotExists": {
+                "_id": item_id,
+                "_type": "mastery",
+                "title": title,
+                "user": {"_type": "reference", "_ref": user_id, "_weak": True},
+                "srs": srs,
+            }
+        },
+        {
+            # Dotted paths keep srs.neurons intact
+            "patch": {
+                "id": item_id,
+                "set": {"title": title, **{f"srs.{k}": v for k, v in srs.items()}},
+            }
+        },
+    ]
+    return mutations, item
+
+
+def commit_review(user_id: str, item: dict):
+    """Record an applied review in the user's index."""
+    get_index(user_id).upsert(item)
+
+
+def reschedule_user(user_id: str, shift_days: float = 0.0, spread_days: float = 0.0) -> int:
+    """Bulk-reschedule a user's items and write the new dates back. Returns count changed."""
+    index = get_index(user_id, refresh=True)
+    updates = index.reschedule(shift_days=shift_days, spread_days=spread_days)
+    if updates:
+        sanity_api.mutate([
+            {"patch": {"id": item_id, "set": {"srs.nextReviewDate": _to_iso(ts)}}}
+            for item_id, ts in updates.items()
+        ])
+    return len(updates)
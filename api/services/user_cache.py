@@ -0,0 +1,56 @@
+"""
+Bounded per-user cache for objects loaded from Sanity (neuron graphs,
+review indexes).
+
+Each worker keeps an entry for at most `ttl` seconds and at most
+`max_users` entries, least recently used out first, so memory stays flat
+however many users a worker has served. Expired entries are dropped, not
+just reloaded on that user's next call.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class UserCache(Generic[T]):
+    """user_id -> object built by `loader`, held for `ttl` seconds, at most `max_users` of them."""
+
+    def __init__(self, loader: Callable[[str], T], ttl: float, max_users: int):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_users = max_users
+        # user_id -> (object, loaded_at), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: str, refresh: bool = False) -> T:
+        """The user's object, loaded (outside the lock) when missing, expired or refresh is set."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and not refresh and now - entry[1] <= self.ttl:
+                self._entries.move_to_end(user_id)
+                return entry[0]
+        value = self.loader(user_id)
+        self.put(user_id, value)
+        return value
+
+    def put(self, user_id: str, value: T):
+        now = time.time()
+        with self._lock:
+            self._entries[user_id] = (value, now)
+            self._entries.move_to_end(user_id)
+            for key in [k for k, (_, loaded_at) in self._entries.items() if now - loaded_at > self.ttl]:
+                del self._entries[key]
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
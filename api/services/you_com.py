@@ -1,23 +1,33 @@
 """
 You.com API client: search (concept enrichment) and Express (LLM for Socratic questions).
 """
-import requests
-
 # Import from parent package (config lives in api/ when run from api/)
 try:
     from api.config import (
         YOU_COM_API_KEY,
         YOU_COM_SEARCH_URL,
         YOU_COM_EXPRESS_URL,
+        CACHE_TTL_EXPRESS,
+        CACHE_TTL_SEARCH,
     )
 except ImportError:
     from config import (
         YOU_COM_API_KEY,
         YOU_COM_SEARCH_URL,
         YOU_COM_EXPRESS_URL,
+        CACHE_TTL_EXPRESS,
+        CACHE_TTL_SEARCH,
     )
 
+try:
+    from api.socratic_questions import rate_limit
+    from api.socratic_questions.cache import cached
+except ImportError:
+    from socratic_questions import rate_limit
+    from socratic_questions.cache import cached
+
 
+@cached("youcom.express", ttl=CACHE_TTL_EXPRESS)
 def express_ask(prompt: str, timeout: int = 25):
     """
     Call You.com Express API (LLM). Returns the agent's text answer or None on error.
@@ -26,7 +36,9 @@ def express_ask(prompt: str, timeout: int = 25):
     if not YOU_COM_API_KEY:
         return None
     try:
-        resp = requests.post(
+        resp = rate_limit.request(
+            "youcom",
+            "POST",
             YOU_COM_EXPRESS_URL,
             json={
                 "agent": "express",
@@ -51,6 +63,7 @@ def express_ask(prompt: str, timeout: int = 25):
         return None
 
 
+@cached("youcom.search", ttl=CACHE_TTL_SEARCH)
 def search(query: str, count: int = 3):
     """
     Call You.com search; return list of items with title, description, snippets.
@@ -59,7 +72,9 @@ def search(query: str, count: int = 3):
     if not YOU_COM_API_KEY:
         return []
     try:
-        resp = requests.get(
+        resp = rate_limit.request(
+            "youcom",
+            "GET",
             YOU_COM_SEARCH_URL,
             params={"query": query, "count": count},
             headers={"X-API-Key": YOU_COM_API_KEY},
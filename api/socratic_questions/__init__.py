@@ -1 +1,11 @@
-from .graph import socratic_questions
\ No newline at end of file
+# The LangGraph app (graph -> nodes -> Sanity client) is only built when one
+# of these names is used, so importing a light submodule such as
+# socratic_questions.rate_limit or .cache from services/ doesn't pull it in.
+_GRAPH_EXPORTS = ("socratic_questions", "start_session", "resume_session")
+
+
+def __getattr__(name):
+    if name in _GRAPH_EXPORTS:
+        from . import graph
+        return getattr(graph, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
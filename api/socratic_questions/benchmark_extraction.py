@@ -0,0 +1,59 @@
+"""
+Benchmark PDF text extraction: pages/s per backend and worker count.
+Defaults to the PDFs bundled in public/.
+Usage: python benchmark_extraction.py [pdf ...] [--backends pypdf2,pypdf] [--workers 1,2,4]
+"""
+import argparse
+import glob
+import os
+import time
+
+try:
+    from .pdf_text import available_backends, iter_pages, page_count
+except ImportError:
+    from pdf_text import available_backends, iter_pages, page_count
+
+PUBLIC_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "public"
+)
+
+
+def benchmark(pdfs, backends, worker_counts, repeat=1):
+    """[(backend, workers, pages, seconds)] for each combination, best of `repeat`."""
+    rows = []
+    for backend in backends:
+        counts = {pdf: page_count(pdf, backend) for pdf in pdfs}
+        for workers in worker_counts:
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                for pdf in pdfs:
+                    for _page in iter_pages(pdf, backend=backend, workers=workers, total_pages=counts[pdf]):
+                        pass
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            rows.append((backend, workers, sum(counts.values()), best))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark PDF text extraction")
+    parser.add_argument("pdfs", nargs="*", help="PDF files (default: public/*.pdf)")
+    parser.add_argument("--backends", default=",".join(available_backends()),
+                        help="comma-separated backends (default: all installed)")
+    parser.add_argument("--workers", default=",".join(
+        str(n) for n in sorted({1, 2, 4, os.cpu_count() or 1}) if n <= (os.cpu_count() or 1)
+    ), help="comma-separated worker counts (default: 1,2,4 up to the core count)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pdfs = args.pdfs or sorted(glob.glob(os.path.join(PUBLIC_DIR, "*.pdf")))
+    if not pdfs:
+        parser.error("No PDFs given and none found in public/")
+    backends = [b for b in args.backends.split(",") if b]
+    worker_counts = [int(n) for n in args.workers.split(",")]
+
+    print(f"{len(pdfs)} PDFs, {os.cpu_count()} cores")
+    print(f"{'backend':<10}{'workers':>8}{'pages':>8}{'seconds':>10}{'pages/s':>10}")
+    for backend, workers, pages, seconds in benchmark(pdfs, backends, worker_counts, args.repeat):
+        print(f"{backend:<10}{workers:>8}{pages:>8}{seconds:>10.2f}{pages / seconds:>10.1f}")
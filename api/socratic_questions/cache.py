@@ -0,0 +1,312 @@
+"""
+Pluggable result cache for upstream calls (LLM answers, search results,
+retrieved context).
+
+Backends share one interface (get/set/delete/clear):
+- "memory": per-process LRU, bounded by CACHE_MEMORY_MAX_BYTES;
+- "sqlite": one file shared by every gunicorn worker and kept across
+  restarts, bounded by CACHE_MAX_BYTES (least recently used go first);
+- "redis":  any Redis-compatible server at REDIS_URL (needs `redis`);
+  eviction is the server's maxmemory policy;
+- "none":   caching off.
+Values are pickled, so hits skip re-parsing upstream JSON.
+Wrap functions with @cached(namespace, ttl).
+"""
+import functools
+from abc import ABC, abstractmethod
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_PATH = os.getenv(
+    "CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache.db"),
+)
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_MEMORY_MAX_BYTES = int(os.getenv("CACHE_MEMORY_MAX_BYTES", str(32 * 1024 * 1024)))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Check the SQLite cache size every this many writes
+EVICT_CHECK_EVERY = 32
+# Don't rewrite an entry's access time more often than this (seconds)
+TOUCH_INTERVAL = 60
+
+MISSING = object()
+
+
+def _dumps(value: Any) -> bytes:
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class Cache(ABC):
+    """Interface: values are any picklable object; ttl is in seconds (None = no expiry)."""
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """The cached value, or MISSING."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+
+class NullCache(Cache):
+    def get(self, key):
+        return MISSING
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+
+class MemoryCache(Cache):
+    """Per-process LRU bounded by the pickled size of its values."""
+
+    def __init__(self, max_bytes: int = CACHE_MEMORY_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        # key -> (value, size, expires_at or None)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            value, size, expires = entry
+            if expires is not None and expires <= time.time():
+                del self._entries[key]
+                self.size -= size
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        size = len(_dumps(value))
+        if size > self.max_bytes:
+            return
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (value, size, expires)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def delete(self, key):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+class SQLiteCache(Cache):
+    """File-backed cache shared by all processes on the host."""
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, expires, accessed FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return MISSING
+        value, expires, accessed = row
+        now = time.time()
+        if expires is not None and expires <= now:
+            with conn:
+                conn.execute("DELETE FROM entries WHERE key = ? AND expires <= ?", (key, now))
+            return MISSING
+        if now - accessed > TOUCH_INTERVAL:
+            # Approximate LRU without a write on every hit
+            with conn:
+                conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        data = _dumps(value)
+        if len(data) > self.max_bytes:
+            return
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now + ttl if ttl else None, now),
+            )
+        self._writes += 1
+        if self._writes % EVICT_CHECK_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones down to 90% of max_bytes."""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+            total = conn.execute("SELECT total(size) FROM entries").fetchone()[0]
+            excess = total - self.max_bytes * 0.9
+            if total <= self.max_bytes or excess <= 0:
+                return
+            doomed = []
+            for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+                doomed.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+
+    def delete(self, key):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM entries")
+
+
+class RedisCache(Cache):
+    """Redis-compatible server; size eviction is left to its maxmemory policy."""
+
+    def __init__(self, url: str = REDIS_URL):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        data = self.client.get(key)
+        return MISSING if data is None else pickle.loads(data)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, _dumps(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def clear(self):
+        self.client.flushdb()
+
+
+_cache: Optional[Cache] = None
+_cache_lock = threading.Lock()
+
+
+def create_cache(backend: str = CACHE_BACKEND) -> Cache:
+    """A cache for the named backend; falls back to memory if it can't be set up."""
+    backend = (backend or "none").lower()
+    try:
+        if backend == "sqlite":
+            cache = SQLiteCache()
+            cache._conn()
+            return cache
+        if backend == "redis":
+            cache = RedisCache()
+            cache.client.ping()
+            return cache
+    except Exception as e:
+        logger.error(f"Cache backend '{backend}' unavailable ({e}); using in-memory cache")
+        return MemoryCache()
+    if backend == "memory":
+        return MemoryCache()
+    return NullCache()
+
+
+def get_cache() -> Cache:
+    """The process-wide cache (CACHE_BACKEND), created on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_cache()
+    return _cache
+
+
+def make_key(namespace: str, *args, **kwargs) -> str:
+    raw = json.dumps([args, kwargs], sort_keys=True, default=str)
+    return f"{namespace}:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+
+def cached(namespace: str, ttl: Optional[float] = None, should_cache: Callable[[Any], bool] = bool):
+    """
+    Cache a function's results under `namespace`, keyed by its arguments.
+    Results failing should_cache (by default: empty/None, i.e. upstream
+    errors) are not stored. Cache errors never fail the call.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = make_key(namespace, *args, **kwargs)
+            cache = get_cache()
+            try:
+                value = cache.get(key)
+            except Exception as e:
+                logger.warning(f"Cache read failed for {namespace}: {e}")
+                value = MISSING
+            if value is not MISSING:
+                return value
+            value = fn(*args, **kwargs)
+            if should_cache(value):
+                try:
+                    cache.set(key, value, ttl)
+                except Exception as e:
+                    logger.warning(f"Cache write failed for {namespace}: {e}")
+            return value
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
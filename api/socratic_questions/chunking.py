@@ -0,0 +1,60 @@
+"""
+Split page text into overlapping, size-bounded chunks for retrieval.
+Each chunk keeps its character offsets so hits can be anchored back to the page.
+"""
+import os
+import re
+from typing import Dict, List
+
+CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "800"))
+CHUNK_OVERLAP_CHARS = int(os.getenv("CHUNK_OVERLAP_CHARS", "150"))
+
+# Preferred break points, best first: paragraph, sentence end, any whitespace.
+_BREAKS = (re.compile(r"\n\s*\n"), re.compile(r"[.!?][\"')\]]?\s"), re.compile(r"\s"))
+
+
+def _find_break(text: str, start: int, end: int) -> int:
+    """Return the best split position in text[start:end], searching the back half."""
+    floor = start + (end - start) // 2
+    for pattern in _BREAKS:
+        last = None
+        for m in pattern.finditer(text, floor, end):
+            last = m
+        if last:
+            return last.end()
+    return end
+
+
+def chunk_text(
+    text: str,
+    max_chars: int = CHUNK_MAX_CHARS,
+    overlap: int = CHUNK_OVERLAP_CHARS,
+) -> List[Dict]:
+    """
+    Split text into chunks of at most max_chars, each overlapping the
+    previous one by about `overlap` characters.
+
+    Returns:
+        [{"index": int, "start": int, "end": int, "content": str}]
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    overlap = max(0, min(overlap, max_chars // 2))
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            end = _find_break(text, start, end)
+        content = text[start:end].strip()
+        if content:
+            chunks.append({"index": len(chunks), "start": start, "end": end, "content": content})
+        if end >= len(text):
+            break
+        # Step back for overlap, but start the next chunk on a word boundary
+        next_start = max(end - overlap, start + 1)
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space != -1 else next_start
+    return chunks
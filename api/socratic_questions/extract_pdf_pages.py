@@ -1,15 +1,31 @@
 """
 Extract pages from PDF and upload to Sanity.
+Each page is stored as a `page` document plus overlapping `pageChunk`
+documents (see chunking.py) that the embeddings index retrieves over.
+Chunks are also added to the local BM25 index (see lexical_index.py).
+Text is extracted in parallel (see pdf_text.py; PDF_BACKEND, PDF_WORKERS)
+and each page is uploaded as soon as it is extracted.
 Usage: python extract_pdf_pages.py <textbook_id>
 """
 import sys
 import os
 from dotenv import load_dotenv
-import PyPDF2
 from sanity import Client
 import requests
 import logging
 
+try:
+    from .chunking import chunk_text
+    from . import lexical_index, rate_limit
+    from .pdf_text import iter_pages, page_count, resolve_backend
+    from .sanity_embeddings import create_textbook_index, shard_index_name
+except ImportError:
+    from chunking import chunk_text
+    import lexical_index
+    import rate_limit
+    from pdf_text import iter_pages, page_count, resolve_backend
+    from sanity_embeddings import create_textbook_index, shard_index_name
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -61,6 +77,53 @@ def get_pdf_path(textbook_id):
     return title, pdf_url
 
 
+def build_page_mutations(textbook_id, textbook_title, page_number, text, chunks=None):
+    """
+    Mutations for one page: the page document and its chunks.
+    IDs are deterministic so re-running the extraction replaces documents
+    instead of duplicating them; chunks left over from a run that cut the
+    page into more pieces are deleted.
+    """
+    page_id = f"page-{textbook_id}-{page_number}"
+    textbook_ref = {"_type": "reference", "_ref": textbook_id}
+
+    mutations = [
+        {
+            "createOrReplace": {
+                "_id": page_id,
+                "_type": "page",
+                "textbook": textbook_ref,
+                "pageNumber": page_number,
+                "content": text,
+                "title": f"{textbook_title} - Page {page_number}"
+            }
+        }
+    ]
+    if chunks is None:
+        chunks = chunk_text(text)
+    for chunk in chunks:
+        mutations.append({
+            "createOrReplace": {
+                "_id": f"chunk-{textbook_id}-{page_number}-{chunk['index']}",
+                "_type": "pageChunk",
+                "textbook": textbook_ref,
+                "page": {"_type": "reference", "_ref": page_id},
+                "pageNumber": page_number,
+                "chunkIndex": chunk["index"],
+                "charStart": chunk["start"],
+                "charEnd": chunk["end"],
+                "content": chunk["content"]
+            }
+        })
+    mutations.append({
+        "delete": {
+            "query": '*[_type == "pageChunk" && page._ref == $pageId && chunkIndex >= $chunkCount]',
+            "params": {"pageId": page_id, "chunkCount": len(chunks)},
+        }
+    })
+    return mutations
+
+
 def extract_pages_from_pdf(pdf_path, textbook_id, textbook_title):
     """Extract text from each page and upload to Sanity."""
     import requests
@@ -72,50 +135,38 @@ def extract_pages_from_pdf(pdf_path, textbook_id, textbook_title):
         with open(pdf_path, 'wb') as f:
             f.write(response.content)
     
-    # Read PDF
-    with open(pdf_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        total_pages = len(pdf_reader.pages)
-        
-        print(f"\nExtracting {total_pages} pages from '{textbook_title}'...")
-        
-        # Prepare mutations API endpoint
-        url = f"https://{SANITY_PROJECT_ID}.api.sanity.io/v2021-06-07/data/mutate/{SANITY_DATASET}"
-        headers = {
-            "Authorization": f"Bearer {SANITY_TOKEN}",
-            "Content-Type": "application/json"
-        }
+    backend = resolve_backend()
+    total_pages = page_count(pdf_path, backend)
+    
+    print(f"\nExtracting {total_pages} pages from '{textbook_title}' ({backend})...")
+    
+    # Prepare mutations API endpoint
+    url = f"https://{SANITY_PROJECT_ID}.api.sanity.io/v2021-06-07/data/mutate/{SANITY_DATASET}"
+    headers = {
+        "Authorization": f"Bearer {SANITY_TOKEN}",
+        "Content-Type": "application/json"
+    }
+    
+    # Pages stream in order from the worker pool while earlier ones upload
+    for page_number, text in iter_pages(pdf_path, backend=backend, total_pages=total_pages):
+        chunks = chunk_text(text)
+        lexical_index.index_page_chunks(textbook_id, textbook_title, page_number, chunks)
         
-        for page_num in range(total_pages):
-            page = pdf_reader.pages[page_num]
-            text = page.extract_text()
-            
-            # Create page document using mutations API
-            mutation = {
-                "mutations": [
-                    {
-                        "create": {
-                            "_type": "page",
-                            "textbook": {
-                                "_type": "reference",
-                                "_ref": textbook_id
-                            },
-                            "pageNumber": page_num + 1,
-                            "content": text,
-                            "title": f"{textbook_title} - Page {page_num + 1}"
-                        }
-                    }
-                ]
-            }
-            
-            try:
-                response = requests.post(url, json=mutation, headers=headers)
-                response.raise_for_status()
-                print(f"✓ Page {page_num + 1}/{total_pages} uploaded")
-            except Exception as e:
-                print(f"✗ Page {page_num + 1} failed: {e}")
+        # Create page + chunk documents in one transaction
+        mutations = build_page_mutations(textbook_id, textbook_title, page_number, text, chunks)
+        mutation = {"mutations": mutations}
         
-        print(f"\n✓ Extraction complete! {total_pages} pages uploaded.")
+        try:
+            # Bulk upload: wait as long as it takes for a mutation slot
+            response = rate_limit.request(
+                "sanity_mutate", "POST", url, deadline=300, json=mutation, headers=headers
+            )
+            response.raise_for_status()
+            print(f"✓ Page {page_number}/{total_pages} uploaded ({len(chunks)} chunks)")
+        except Exception as e:
+            print(f"✗ Page {page_number} failed: {e}")
+    
+    print(f"\n✓ Extraction complete! {total_pages} pages uploaded.")
 
 
 if __name__ == "__main__":
@@ -129,4 +180,12 @@ if __name__ == "__main__":
     
     title, pdf_url = get_pdf_path(textbook_id)
     if pdf_url:
-        extract_pages_from_pdf(pdf_url, textbook_id, title)
\ No newline at end of file
+        extract_pages_from_pdf(pdf_url, textbook_id, title)
+        
+        # Per-textbook embeddings shard so retrieval never scans other books
+        index_name = shard_index_name(textbook_id)
+        if index_name:
+            if create_textbook_index(textbook_id):
+                print(f"✓ Embeddings index '{index_name}' ready")
+            else:
+                print(f"✗ Could not create embeddings index '{index_name}'; using global index")
\ No newline at end of file
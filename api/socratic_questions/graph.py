@@ -1,7 +1,121 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
 from langgraph.graph import StateGraph, END
+from langgraph.checkpoint.memory import MemorySaver
 from .schema import QuestionState
 from .nodes import fetch_page_node, generate_question_node, commit_to_sanity_node
 
+logger = logging.getLogger(__name__)
+
+# Checkpointer backend: "sqlite" (shared by all gunicorn workers on the same
+# host, survives restarts) or "memory" (single worker process only: a thread
+# started in one worker is unknown to the others).
+CHECKPOINTER = os.getenv("SOCRATIC_CHECKPOINTER", "sqlite").strip().lower()
+CHECKPOINT_DB = os.getenv(
+    "SOCRATIC_CHECKPOINT_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".socratic_checkpoints.db"),
+)
+# Paused threads nobody answered are dropped after this many seconds
+THREAD_TTL = float(os.getenv("SOCRATIC_THREAD_TTL", str(24 * 3600)))
+# Look for abandoned threads at most this often (seconds, per process)
+PRUNE_INTERVAL = 600
+
+
+def _worker_count() -> int:
+    """gunicorn workers configured for this deployment (WEB_CONCURRENCY or --workers)."""
+    args = os.getenv("GUNICORN_CMD_ARGS", "").split()
+    for i, arg in enumerate(args):
+        if arg.startswith("--workers="):
+            return int(arg.split("=", 1)[1])
+        if arg in ("-w", "--workers") and i + 1 < len(args):
+            return int(args[i + 1])
+    return int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+def get_checkpointer(backend: str = CHECKPOINTER):
+    """Build the checkpointer that stores paused threads between requests."""
+    if backend == "memory":
+        if _worker_count() > 1:
+            raise RuntimeError(
+                "SOCRATIC_CHECKPOINTER=memory only works with one worker process; "
+                "use SOCRATIC_CHECKPOINTER=sqlite"
+            )
+        return MemorySaver()
+    if backend != "sqlite":
+        raise ValueError(f"Unknown SOCRATIC_CHECKPOINTER '{backend}'; choose sqlite or memory")
+    # pip install langgraph-checkpoint-sqlite
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    conn = sqlite3.connect(CHECKPOINT_DB, check_same_thread=False)
+    return SqliteSaver(conn)
+
+
+class ThreadActivity:
+    """
+    Last-touched time per thread, so abandoned threads can be pruned. Kept
+    next to the checkpoints (a table in CHECKPOINT_DB) for the sqlite
+    backend, in process memory for the memory backend.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._local = threading.local()
+        self._touched: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_activity ("
+                "thread_id TEXT PRIMARY KEY, touched REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS thread_activity_touched ON thread_activity (touched)")
+            self._local.conn = conn
+        return conn
+
+    def touch(self, thread_id: str):
+        if self.path is None:
+            with self._lock:
+                self._touched[thread_id] = time.time()
+            return
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO thread_activity (thread_id, touched) VALUES (?, ?)",
+                (thread_id, time.time()),
+            )
+
+    def forget(self, thread_ids: list[str]):
+        if self.path is None:
+            with self._lock:
+                for thread_id in thread_ids:
+                    self._touched.pop(thread_id, None)
+            return
+        with self._conn() as conn:
+            conn.executemany("DELETE FROM thread_activity WHERE thread_id = ?", [(t,) for t in thread_ids])
+
+    def claim(self, thread_id: str) -> bool:
+        """Remove a thread's row; True for exactly one caller, so it alone may resume it."""
+        if self.path is None:
+            with self._lock:
+                return self._touched.pop(thread_id, None) is not None
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM thread_activity WHERE thread_id = ?", (thread_id,)).rowcount > 0
+
+    def older_than(self, cutoff: float) -> list[str]:
+        if self.path is None:
+            with self._lock:
+                return [t for t, touched in self._touched.items() if touched < cutoff]
+        rows = self._conn().execute("SELECT thread_id FROM thread_activity WHERE touched < ?", (cutoff,))
+        return [row[0] for row in rows]
+
+
 #keeps track of the states: fetch, generate, save
 builder = StateGraph(QuestionState)
 
@@ -12,8 +126,92 @@ builder.add_node("save_to_db", commit_to_sanity_node) # Add this!
 builder.set_entry_point("fetch_page")
 builder.add_edge("fetch_page", "generate_question")
 
-# The graph will pause here until the frontend sends back the user_answer and confidence.
+# The graph pauses before save_to_db until the frontend sends back the
+# user_answer and confidence; fetch/generate run exactly once per thread.
 builder.add_edge("generate_question", "save_to_db")
 builder.add_edge("save_to_db", END)
 
-socratic_questions = builder.compile()
\ No newline at end of file
+checkpointer = get_checkpointer()
+activity = ThreadActivity(CHECKPOINT_DB if CHECKPOINTER == "sqlite" else None)
+_last_prune = 0.0
+
+socratic_questions = builder.compile(
+    checkpointer=checkpointer,
+    interrupt_before=["save_to_db"],
+)
+
+
+def _thread_config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def delete_threads(thread_ids: list[str]):
+    """Drop the checkpoints of finished or abandoned threads."""
+    for thread_id in thread_ids:
+        checkpointer.delete_thread(thread_id)
+    activity.forget(thread_ids)
+
+
+def prune_threads(ttl: float = THREAD_TTL) -> int:
+    """Delete threads untouched for `ttl` seconds. Returns how many went."""
+    stale = activity.older_than(time.time() - ttl)
+    if stale:
+        delete_threads(stale)
+    return len(stale)
+
+
+def _maybe_prune():
+    global _last_prune
+    now = time.time()
+    if now - _last_prune < PRUNE_INTERVAL:
+        return
+    _last_prune = now
+    try:
+        pruned = prune_threads()
+        if pruned:
+            logger.info(f"Pruned {pruned} abandoned Socratic threads")
+    except Exception as e:
+        logger.warning(f"Pruning Socratic threads failed: {e}")
+
+
+def start_session(inputs: dict) -> tuple[str, dict]:
+    """
+    Run fetch -> generate for a new thread and stop before save_to_db.
+    Returns (thread_id, state values).
+    """
+    _maybe_prune()
+    thread_id = str(uuid.uuid4())
+    activity.touch(thread_id)
+    state = socratic_questions.invoke(inputs, _thread_config(thread_id))
+    return thread_id, state
+
+
+def resume_session(thread_id: str, user_answer: str, user_confidence) -> dict | None:
+    """
+    Resume a paused thread with the student's answer and run save_to_db.
+    Returns the final state, or None if the thread is unknown or not waiting
+    for an answer (or another request is already resuming it). A finished
+    thread is deleted.
+    """
+    # Claim the thread first: of concurrent answers only one runs save_to_db
+    if not activity.claim(thread_id):
+        return None
+    config = _thread_config(thread_id)
+    try:
+        snapshot = socratic_questions.get_state(config)
+        if not snapshot.values or "save_to_db" not in (snapshot.next or ()):
+            if snapshot.values:
+                activity.touch(thread_id)
+            return None
+
+        socratic_questions.update_state(
+            config,
+            {"user_answer": user_answer, "user_confidence": user_confidence},
+        )
+        state = socratic_questions.invoke(None, config)
+    except Exception:
+        # Let the student retry (or the thread expire)
+        activity.touch(thread_id)
+        raise
+    delete_threads([thread_id])
+    return state
@@ -0,0 +1,270 @@
+"""
+Local BM25 full-text index over extracted page chunks (SQLite FTS5).
+
+Built by extract_pdf_pages.py alongside the Sanity upload and queried
+in-process by sanity_embeddings: as a fallback when the embeddings index is
+slow or down, and as a lexical re-ranking signal for embedding hits.
+"""
+import os
+import re
+import sqlite3
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LEXICAL_INDEX_PATH = os.getenv(
+    "LEXICAL_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".lexical_index.db"),
+)
+# Weight of the BM25 signal when blending with embedding scores (0 = off)
+LEXICAL_WEIGHT = float(os.getenv("LEXICAL_WEIGHT", "0.3"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    document_id TEXT UNIQUE NOT NULL,
+    textbook_id TEXT NOT NULL,
+    textbook_title TEXT,
+    page_number INTEGER,
+    chunk_index INTEGER,
+    char_start INTEGER,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_page ON chunks (textbook_id, page_number);
+-- textbook_id is an indexed FTS column so scoped queries only walk that
+-- book's postings instead of filtering hits from the whole library.
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    content, textbook_id, content='chunks', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+    INSERT INTO chunks_fts (rowid, content, textbook_id)
+    VALUES (new.id, new.content, new.textbook_id);
+END;
+CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+    INSERT INTO chunks_fts (chunks_fts, rowid, content, textbook_id)
+    VALUES ('delete', old.id, old.content, old.textbook_id);
+END;
+"""
+
+# General English function words (3+ letters), ignored when matching text;
+# shared with services/answer_scoring.py
+STOPWORDS = frozenset({
+    "the", "and", "for", "are", "but", "not", "you", "all", "any", "can",
+    "was", "one", "our", "out", "has", "had", "how", "its", "who", "what",
+    "that", "this", "with", "from", "have", "when", "they", "them", "then",
+    "than", "there", "their", "which", "will", "would", "could", "should",
+    "into", "also", "about", "because", "some", "more", "most", "other",
+    "such", "only", "very", "just", "these", "those", "been", "being",
+    "were", "does", "did", "your", "each", "many", "much", "where", "while",
+    "same", "both", "between", "within", "without", "here", "over", "under",
+})
+# Words of the question templates that say nothing about the topic
+_QUERY_STOPWORDS = STOPWORDS | {"page", "key"}
+
+_local = threading.local()
+
+
+def get_connection(path: str = LEXICAL_INDEX_PATH) -> Optional[sqlite3.Connection]:
+    """Per-thread connection to the index, or None if it can't be opened."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    if path not in conns:
+        try:
+            conn = sqlite3.connect(path)
+            conn.row_factory = sqlite3.Row
+            conn.executescript(_SCHEMA)
+            conns[path] = conn
+        except sqlite3.Error as e:
+            logger.error(f"Lexical index unavailable at {path}: {e}")
+            conns[path] = None
+    return conns[path]
+
+
+def index_page_chunks(
+    textbook_id: str,
+    textbook_title: str,
+    page_number: int,
+    chunks: List[Dict[str, Any]],
+    path: str = LEXICAL_INDEX_PATH,
+) -> int:
+    """
+    Replace the indexed chunks of one page. `chunks` come from chunk_text().
+    Returns the number of chunks indexed.
+    """
+    conn = get_connection(path)
+    if conn is None:
+        return 0
+    with conn:
+        conn.execute(
+            "DELETE FROM chunks WHERE textbook_id = ? AND page_number = ?",
+            (textbook_id, page_number),
+        )
+        conn.executemany(
+            "INSERT INTO chunks (document_id, textbook_id, textbook_title, page_number,"
+            " chunk_index, char_start, content) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    f"chunk-{textbook_id}-{page_number}-{c['index']}",
+                    textbook_id,
+                    textbook_title,
+                    page_number,
+                    c["index"],
+                    c["start"],
+                    c["content"],
+                )
+                for c in chunks
+            ],
+        )
+    return len(chunks)
+
+
+def _match_expression(query: str, textbook_id: Optional[str] = None) -> str:
+    """Turn free text into an FTS5 OR-query of quoted terms, optionally scoped to a textbook."""
+    terms = []
+    for word in re.findall(r"\w+", (query or "").lower()):
+        if len(word) > 2 and word not in _QUERY_STOPWORDS and word not in terms:
+            terms.append(word)
+    if not terms:
+        return ""
+    expression = "content : (" + " OR ".join(f'"{t}"' for t in terms) + ")"
+    if textbook_id:
+        scope = textbook_id.replace('"', '""')
+        expression = f'textbook_id : "{scope}" AND {expression}'
+    return expression
+
+
+def search(
+    query: str,
+    top_k: int = 3,
+    textbook_id: Optional[str] = None,
+    path: str = LEXICAL_INDEX_PATH,
+) -> List[Dict[str, Any]]:
+    """
+    BM25 search over indexed chunks, best first. With textbook_id, only that
+    textbook's chunks are candidates.
+
+    Returns chunks shaped like get_textbook_context_chunks() results; `score`
+    is the negated FTS5 bm25() rank (higher is better, unbounded).
+    """
+    expression = _match_expression(query, textbook_id)
+    conn = get_connection(path)
+    if not expression or conn is None:
+        return []
+    sql = (
+        "SELECT c.document_id, c.textbook_title, c.page_number, c.chunk_index,"
+        " c.char_start, c.content, bm25(chunks_fts, 1.0, 0.0) AS rank"
+        " FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid"
+        " WHERE chunks_fts MATCH ?"
+    )
+    params: list = [expression]
+    if textbook_id:
+        # The FTS phrase narrows candidates; this makes the scope exact
+        sql += " AND c.textbook_id = ?"
+        params.append(textbook_id)
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(top_k)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Lexical search failed: {e}")
+        return []
+    return [
+        {
+            "document_id": r["document_id"],
+            "page_number": r["page_number"],
+            "chunk_index": r["chunk_index"],
+            "char_start": r["char_start"],
+            "textbook_title": r["textbook_title"] or "Unknown",
+            "score": -r["rank"],
+            "content": r["content"],
+        }
+        for r in rows
+    ]
+
+
+def document_frequencies(
+    terms: List[str],
+    textbook_id: Optional[str] = None,
+    path: str = LEXICAL_INDEX_PATH,
+) -> tuple[Dict[str, int], int]:
+    """
+    Number of indexed chunks containing each term (stemmed the same way as
+    search), plus the total chunk count, for IDF weighting. Scoped to a
+    textbook when textbook_id is given. Returns ({}, 0) without an index.
+    """
+    conn = get_connection(path)
+    if conn is None or not terms:
+        return {}, 0
+    try:
+        if textbook_id:
+            total = conn.execute(
+                "SELECT count(*) FROM chunks WHERE textbook_id = ?", (textbook_id,)
+            ).fetchone()[0]
+        else:
+            total = conn.execute("SELECT count(*) FROM chunks").fetchone()[0]
+        if not total:
+            return {}, 0
+        frequencies = {}
+        for term in terms:
+            expression = _match_expression(term, textbook_id)
+            if expression:
+                frequencies[term] = conn.execute(
+                    "SELECT count(*) FROM chunks_fts WHERE chunks_fts MATCH ?", (expression,)
+                ).fetchone()[0]
+        return frequencies, total
+    except sqlite3.Error as e:
+        logger.error(f"Lexical document frequencies failed: {e}")
+        return {}, 0
+
+
+def normalize_scores(lexical: List[Dict[str, Any]]) -> Dict[str, float]:
+    """BM25 scores min-max normalised to [0, 1] within the result set, by document_id."""
+    if not lexical:
+        return {}
+    raw = [c["score"] for c in lexical]
+    low, high = min(raw), max(raw)
+    return {
+        c["document_id"]: (c["score"] - low) / (high - low) if high > low else 1.0
+        for c in lexical
+    }
+
+
+def lexical_only(lexical: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+    """BM25 hits on their own (no embedding hits), scored on the same [0, 1] scale."""
+    lexical_norm = normalize_scores(lexical)
+    return [
+        dict(c, lexical_score=lexical_norm[c["document_id"]], score=lexical_norm[c["document_id"]])
+        for c in lexical[:top_k]
+    ]
+
+
+def hybrid_rerank(
+    semantic: List[Dict[str, Any]],
+    lexical: List[Dict[str, Any]],
+    top_k: int,
+    weight: float = LEXICAL_WEIGHT,
+) -> List[Dict[str, Any]]:
+    """
+    Blend embedding hits with BM25 hits by document_id.
+
+    BM25 scores are min-max normalised to [0, 1] within the result set so
+    they are comparable with embedding similarities; each chunk scores
+    (1 - weight) * semantic + weight * lexical. Lexical-only hits are kept,
+    since they already carry their text.
+    """
+    if not lexical or weight <= 0:
+        return semantic[:top_k]
+
+    lexical_norm = normalize_scores(lexical)
+
+    merged = {c["document_id"]: dict(c, semantic_score=0.0) for c in lexical}
+    for c in semantic:
+        merged[c["document_id"]] = dict(c, semantic_score=c["score"])
+    for doc_id, c in merged.items():
+        c["lexical_score"] = lexical_norm.get(doc_id, 0.0)
+        c["score"] = (1 - weight) * c["semantic_score"] + weight * c["lexical_score"]
+
+    return sorted(merged.values(), key=lambda c: c["score"], reverse=True)[:top_k]
@@ -0,0 +1,223 @@
+"""
+Hedged routing across the LLM providers (You.com Express and Gemini).
+
+The primary provider is asked first. If it hasn't answered within its
+recent p95 latency (clamped to [LLM_HEDGE_MIN_DELAY, LLM_HEDGE_MAX_DELAY]),
+the same prompt goes to the secondary, and the first good answer wins; a
+failed primary hands over at once. The losing call can't be aborted
+mid-request, so it finishes in the background, its answer is dropped, and
+its latency still feeds the stats. Latencies are kept per provider in a
+rolling window, so the hedge delay follows each provider's current tail.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import MISSING, cached, get_cache, make_key
+
+logger = logging.getLogger(__name__)
+
+# Set to "0" to always wait for the primary only
+LLM_HEDGE = os.getenv("LLM_HEDGE", "1") not in ("0", "false", "no")
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "95"))
+# Hedge delay bounds (seconds); LLM_HEDGE_DEFAULT_DELAY applies until a
+# provider has LLM_STATS_MIN_SAMPLES answers on record
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5"))
+LLM_HEDGE_MAX_DELAY = float(os.getenv("LLM_HEDGE_MAX_DELAY", "10"))
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "3"))
+LLM_STATS_WINDOW = int(os.getenv("LLM_STATS_WINDOW", "200"))
+LLM_STATS_MIN_SAMPLES = 20
+# Longest the router waits for any answer
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+# Same as the Express cache: identical prompts reuse the answer this long
+LLM_CACHE_TTL = int(os.getenv("CACHE_TTL_EXPRESS", "3600"))
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_ROUTER_THREADS", "32")))
+
+
+class LatencyStats:
+    """Rolling window of one provider's successful latencies, plus failure counts."""
+
+    def __init__(self, window: int = LLM_STATS_WINDOW):
+        self.latencies: deque = deque(maxlen=window)
+        self.calls = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool):
+        with self._lock:
+            self.calls += 1
+            if ok:
+                self.latencies.append(seconds)
+            else:
+                self.failures += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The q-th percentile latency, or None with too few samples."""
+        with self._lock:
+            if len(self.latencies) < LLM_STATS_MIN_SAMPLES:
+                return None
+            samples = np.fromiter(self.latencies, dtype=np.float64)
+        return float(np.percentile(samples, q))
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "p50": self.quantile(50),
+            "p95": self.quantile(95),
+        }
+
+
+def _good(answer) -> bool:
+    return isinstance(answer, str) and len(answer.strip()) > 10
+
+
+class HedgedRouter:
+    """Routes a prompt across named providers: callables prompt -> text or None."""
+
+    def __init__(self, providers: Dict[str, Callable[[str], Optional[str]]]):
+        self.providers = providers
+        self.stats = {name: LatencyStats() for name in providers}
+
+    def hedge_delay(self, name: str) -> float:
+        """How long to wait on `name` before hedging: its recent tail latency."""
+        tail = self.stats[name].quantile(LLM_HEDGE_QUANTILE)
+        delay = LLM_HEDGE_DEFAULT_DELAY if tail is None else tail
+        return min(max(delay, LLM_HEDGE_MIN_DELAY), LLM_HEDGE_MAX_DELAY)
+
+    def _call(self, name: str, prompt: str) -> Optional[str]:
+        started = time.perf_counter()
+        try:
+            answer = self.providers[name](prompt)
+        except Exception as e:
+            logger.warning(f"LLM provider {name} failed: {e}")
+            answer = None
+        ok = _good(answer)
+        self.stats[name].record(time.perf_counter() - started, ok)
+        return answer.strip() if ok else None
+
+    def order(self, primary: Optional[str] = None) -> List[str]:
+        names = list(self.providers)
+        if primary in self.providers:
+            names.remove(primary)
+            names.insert(0, primary)
+        return names
+
+    def ask(self, prompt: str, primary: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        First good answer as (text, provider name), or (None, None) if no
+        provider answered within LLM_TIMEOUT.
+        """
+        names = self.order(primary)
+        if not names:
+            return None, None
+        deadline = time.monotonic() + LLM_TIMEOUT
+        pending = {_executor.submit(self._call, names[0], prompt): names[0]}
+        backups = names[1:] if LLM_HEDGE else []
+        hedge_at = time.monotonic() + self.hedge_delay(names[0])
+
+        while pending:
+            now = time.monotonic()
+            timeout = min(hedge_at, deadline) - now if backups else deadline - now
+            done, _ = wait(pending, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                answer = future.result()
+                if answer:
+                    for loser in pending:
+                        loser.cancel()
+                    if name != names[0]:
+                        logger.info(f"Hedged LLM answer from {name}")
+                    return answer, name
+            if time.monotonic() >= deadline:
+                break
+            # Hedge: the primary is slow (or already failed)
+            if backups and (not pending or time.monotonic() >= hedge_at):
+                name = backups.pop(0)
+                pending[_executor.submit(self._call, name, prompt)] = name
+                hedge_at = time.monotonic() + self.hedge_delay(name)
+        for future in pending:
+            future.cancel()
+        return None, None
+
+    def snapshot(self) -> dict:
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+
+def _youcom_provider():
+    try:
+        from services.you_com import express_ask
+    except ImportError:
+        from api.services.you_com import express_ask
+    # The router caches whole answers; provider latencies must be real calls
+    return express_ask.uncached
+
+
+def _gemini_provider():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    # Set GEMINI_API_ENDPOINT to send Gemini calls to a local stub (see loadtest/)
+    endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash-exp",
+        **({"transport": "rest", "client_options": {"api_endpoint": endpoint}} if endpoint else {}),
+    )
+
+    def invoke(prompt: str) -> str:
+        content = llm.invoke(prompt).content
+        return content if isinstance(content, str) else "".join(
+            part if isinstance(part, str) else part.get("text", "") for part in content
+        )
+    return invoke
+
+
+_router: Optional[HedgedRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> HedgedRouter:
+    """The process-wide router over every provider that could be set up."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                providers = {}
+                for name, factory in (("youcom", _youcom_provider), ("gemini", _gemini_provider)):
+                    try:
+                        providers[name] = factory()
+                    except Exception as e:
+                        logger.error(f"LLM provider {name} unavailable: {e}")
+                _router = HedgedRouter(providers)
+    return _router
+
+
+@cached("llm.answer", ttl=LLM_CACHE_TTL, should_cache=lambda result: bool(result[0]))
+def _ask_cached(prompt: str, primary: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    return get_router().ask(prompt, primary)
+
+
+def cached_answer(prompt: str, primary: Optional[str] = None) -> Optional[Tuple[str, str]]:
+    """The cached (text, provider) for a prompt, or None; never calls a provider."""
+    try:
+        value = get_cache().get(make_key("llm.answer", prompt, primary))
+    except Exception as e:
+        logger.warning(f"Cache read failed for llm.answer: {e}")
+        return None
+    return None if value is MISSING else value
+
+
+def ask(prompt: str, primary: Optional[str] = None, cache: bool = True) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Hedged answer for a prompt as (text, provider); cached per prompt and
+    primary. Pass cache=False for prompts that should get a different
+    answer each time.
+    """
+    if not cache:
+        return get_router().ask(prompt, primary)
+    return _ask_cached(prompt, primary)
@@ -1,10 +1,10 @@
 from .schema import QuestionState
-from .prompts import SYSTEM_PROMPT
+from .prompts import SYSTEM_PROMPT, QUESTION_INSTRUCTIONS
 from .utils import get_sanity_client
-from .sanity_embeddings import get_textbook_context  #Import embeddings
-from langchain_google_genai import ChatGoogleGenerativeAI
+from .sanity_embeddings import get_textbook_context_chunks, format_context_chunk  #Import embeddings
+from .prompt_builder import build_prompt
+from . import llm_router
 
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp")
 sanity = get_sanity_client()
 
 def fetch_page_node(state: QuestionState):
@@ -25,40 +25,34 @@ def fetch_page_node(state: QuestionState):
     page_number = state.get('page_number', 1)
     query = f"page {page_number} key concepts and definitions"
     
-    # Query embeddings for similar content across the entire PDF
-    pdf_context = get_textbook_context(query, top_k=3)
+    # Query embeddings for similar content across the current textbook
+    pdf_context_chunks = get_textbook_context_chunks(query, top_k=3, textbook_id=state.get('textbook_id'))
+    pdf_context = "\n---\n".join(format_context_chunk(c) for c in pdf_context_chunks)
     
     return {
         "page_content": page_content,
-        "pdf_context": pdf_context
+        "pdf_context": pdf_context,
+        "pdf_context_chunks": pdf_context_chunks
     }
 
 def generate_question_node(state: QuestionState):
     """
     Generates a Socratic question using Gemini with BOTH current page and PDF context.
     """
-    page_content = state.get('page_content', '')
-    pdf_context = state.get('pdf_context', '')
+    # Token-budgeted prompt: highest-scoring context first, page fills the rest
+    enhanced_prompt, prompt_metrics = build_prompt(
+        SYSTEM_PROMPT,
+        instructions=QUESTION_INSTRUCTIONS,
+        page_content=state.get('page_content') or '',
+        context_chunks=state.get('pdf_context_chunks') or [],
+    )
     
-    # Enhanced prompt that uses both local and broader context
-    enhanced_prompt = f"""
-{SYSTEM_PROMPT}
-
-BROADER PDF CONTEXT (for background understanding):
-{pdf_context}
-
-CURRENT PAGE CONTENT (focus your question here):
-{page_content}
-
-Generate a Socratic question that:
-1. Tests understanding of the CURRENT PAGE content
-2. Uses the broader PDF context to ensure the question connects to larger themes
-3. Challenges the student to think critically about the material
-"""
-    
-    response = llm.invoke(enhanced_prompt)
+    # Gemini first, hedged to You.com Express when it's slow
+    question, _ = llm_router.ask(enhanced_prompt, primary="gemini")
+    if question is None:
+        raise RuntimeError("No LLM provider returned a question")
     
-    return {"socratic_question": response.content}
+    return {"socratic_question": question, "prompt_metrics": prompt_metrics}
 
 def commit_to_sanity_node(state: QuestionState):
     """
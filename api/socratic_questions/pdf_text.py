@@ -0,0 +1,133 @@
+"""
+PDF text extraction with selectable backends and a process pool.
+
+Backends share one interface: open the file, count pages, extract a page
+range. PyPDF2 is always available; pypdf and PyMuPDF (pymupdf/fitz) are
+used when installed and are faster. iter_pages() splits the page range
+into batches, extracts them across worker processes, and yields pages in
+order as soon as each batch is done, so upload can start immediately.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+# "auto" picks the fastest installed backend (see BACKEND_PREFERENCE)
+PDF_BACKEND = os.getenv("PDF_BACKEND", "auto")
+# Worker processes for extraction (1 = extract in-process)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+# Pages per task: large enough to amortise opening the file in each worker
+PDF_BATCH_PAGES = int(os.getenv("PDF_BATCH_PAGES", "16"))
+
+BACKEND_PREFERENCE = ("pymupdf", "pypdf", "pypdf2")
+
+
+def _pypdf2_pages(pdf_path: str, start: int, end: int) -> List[str]:
+    import PyPDF2
+    reader = PyPDF2.PdfReader(pdf_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _pypdf_pages(pdf_path: str, start: int, end: int) -> List[str]:
+    import pypdf
+    reader = pypdf.PdfReader(pdf_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _pymupdf_pages(pdf_path: str, start: int, end: int) -> List[str]:
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        return [doc[i].get_text() for i in range(start, end)]
+
+
+def _pypdf2_count(pdf_path: str) -> int:
+    import PyPDF2
+    return len(PyPDF2.PdfReader(pdf_path).pages)
+
+
+def _pypdf_count(pdf_path: str) -> int:
+    import pypdf
+    return len(pypdf.PdfReader(pdf_path).pages)
+
+
+def _pymupdf_count(pdf_path: str) -> int:
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+# name -> (module to import, page counter, range extractor)
+BACKENDS = {
+    "pypdf2": ("PyPDF2", _pypdf2_count, _pypdf2_pages),
+    "pypdf": ("pypdf", _pypdf_count, _pypdf_pages),
+    "pymupdf": ("fitz", _pymupdf_count, _pymupdf_pages),
+}
+
+
+def available_backends() -> List[str]:
+    """Installed backends, fastest first."""
+    names = []
+    for name in BACKEND_PREFERENCE:
+        try:
+            __import__(BACKENDS[name][0])
+            names.append(name)
+        except ImportError:
+            pass
+    return names
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """The backend to use: the named one, or the fastest installed for "auto"."""
+    backend = (backend or PDF_BACKEND).lower()
+    if backend == "auto":
+        installed = available_backends()
+        if not installed:
+            raise RuntimeError("No PDF backend installed (pip install PyPDF2)")
+        return installed[0]
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend '{backend}'; choose from {', '.join(BACKENDS)}")
+    return backend
+
+
+def page_count(pdf_path: str, backend: Optional[str] = None) -> int:
+    return BACKENDS[resolve_backend(backend)][1](pdf_path)
+
+
+def _extract_range(task: Tuple[str, str, int, int]) -> List[str]:
+    """Worker entry point: text of pages [start, end) of one file."""
+    backend, pdf_path, start, end = task
+    return BACKENDS[backend][2](pdf_path, start, end)
+
+
+def iter_pages(
+    pdf_path: str,
+    backend: Optional[str] = None,
+    workers: int = PDF_WORKERS,
+    batch_pages: int = PDF_BATCH_PAGES,
+    total_pages: Optional[int] = None,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) for every page, 1-based and in order.
+    With workers > 1, batches of pages are extracted in parallel processes;
+    each page is yielded as soon as its batch (and all earlier ones) is done.
+    """
+    backend = resolve_backend(backend)
+    total = total_pages if total_pages is not None else page_count(pdf_path, backend)
+    if workers > 1:
+        # Smaller batches for short files so every worker gets some pages
+        batch_pages = max(1, min(batch_pages, -(-total // (workers * 2))))
+    tasks = [
+        (backend, pdf_path, start, min(start + batch_pages, total))
+        for start in range(0, total, batch_pages)
+    ]
+    workers = max(1, min(workers, len(tasks)))
+
+    if workers == 1:
+        for task in tasks:
+            for offset, text in enumerate(_extract_range(task)):
+                yield task[2] + offset + 1, text
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for task, texts in zip(tasks, pool.map(_extract_range, tasks)):
+            for offset, text in enumerate(texts):
+                yield task[2] + offset + 1, text
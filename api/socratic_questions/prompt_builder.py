@@ -0,0 +1,169 @@
+"""
+Token-budgeted prompt assembly.
+
+Fits the system prompt, the student's selection, retrieved context chunks and
+the current page into a fixed token budget so long pages don't inflate LLM
+latency and cost. Fill order: system + instructions (always kept), selection,
+highest-scoring context chunks, current page, then any leftover context.
+"""
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+# Shares of the budget that selection / retrieved context may claim up front.
+PROMPT_SELECTION_SHARE = float(os.getenv("PROMPT_SELECTION_SHARE", "0.4"))
+PROMPT_CONTEXT_SHARE = float(os.getenv("PROMPT_CONTEXT_SHARE", "0.3"))
+
+# No tokenizer dependency: ~4 characters per token for English prose.
+CHARS_PER_TOKEN = 4
+# Don't bother squeezing in a truncated context chunk smaller than this.
+MIN_CHUNK_TOKENS = 48
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of text."""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens, preferring a word boundary."""
+    if max_tokens <= 0 or not text:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max_tokens * CHARS_PER_TOKEN - 3
+    cut = text[:max_chars]
+    space = cut.rfind(" ")
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "..."
+
+
+def format_context_chunk(chunk: Dict[str, Any]) -> str:
+    """Render one retrieved chunk the way prompts expect to see it."""
+    return (
+        f"[Page {chunk['page_number']} from '{chunk['textbook_title']}' "
+        f"(relevance: {chunk['score']:.2f})]\n"
+        f"{chunk['content']}\n"
+    )
+
+
+def _section(label: str, text: str) -> str:
+    return f"{label}\n{text}" if label else text
+
+
+def build_prompt(
+    system: str,
+    instructions: str = "",
+    selection: str = "",
+    page_content: str = "",
+    context_chunks: Optional[List[Dict[str, Any]]] = None,
+    budget: Optional[int] = None,
+    selection_label: str = "SELECTED PASSAGE:",
+    page_label: str = "CURRENT PAGE CONTENT (focus your question here):",
+    context_label: str = "BROADER PDF CONTEXT (for background understanding):",
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Assemble a prompt that stays within `budget` tokens.
+
+    Args:
+        system: Leading prompt text, always kept in full
+        instructions: Trailing prompt text, always kept in full
+        selection: Text the student selected (highest priority)
+        page_content: Full text of the current page
+        context_chunks: Retrieved chunks ({score, content, ...}), any order
+        budget: Token budget (default: PROMPT_TOKEN_BUDGET)
+
+    Returns:
+        (prompt, metrics) where metrics records tokens per section and what
+        was truncated or dropped.
+    """
+    budget = budget or PROMPT_TOKEN_BUDGET
+    chunks = sorted(context_chunks or [], key=lambda c: c.get("score", 0), reverse=True)
+    truncated: List[str] = []
+
+    fixed_tokens = estimate_tokens(system) + estimate_tokens(instructions)
+    for label, present in (
+        (selection_label, selection),
+        (page_label, page_content),
+        (context_label, chunks),
+    ):
+        if present:
+            fixed_tokens += estimate_tokens(label) + 1
+    remaining = max(0, budget - fixed_tokens)
+
+    # 1. Selection
+    selection_cap = min(remaining, int(budget * PROMPT_SELECTION_SHARE))
+    selection_text = truncate_to_tokens(selection, selection_cap)
+    if selection_text != selection:
+        truncated.append("selection")
+    remaining -= estimate_tokens(selection_text)
+
+    # 2. Highest-scoring context chunks, up to the context share
+    rendered = [format_context_chunk(c) for c in chunks]
+    used_chunks: List[str] = []
+
+    def add_chunks(cap: int, allow_truncate: bool) -> int:
+        spent = 0
+        while len(used_chunks) < len(rendered):
+            text = rendered[len(used_chunks)]
+            cost = estimate_tokens(text)
+            if spent + cost <= cap:
+                used_chunks.append(text)
+                spent += cost
+                continue
+            if (allow_truncate or not used_chunks) and cap - spent >= MIN_CHUNK_TOKENS:
+                used_chunks.append(truncate_to_tokens(text, cap - spent))
+                spent = cap
+                if "context" not in truncated:
+                    truncated.append("context")
+            break
+        return spent
+
+    # Only cut a chunk here if otherwise the prompt would get no context at all;
+    # a short page may leave room for it in full below.
+    remaining -= add_chunks(
+        min(remaining, int(budget * PROMPT_CONTEXT_SHARE)),
+        allow_truncate=False,
+    )
+
+    # 3. Current page fills what is left
+    page_text = truncate_to_tokens(page_content, remaining)
+    if page_text != page_content:
+        truncated.append("page")
+    remaining -= estimate_tokens(page_text)
+
+    # 4. Short page: spend the leftover on more context
+    if remaining > 0 and len(used_chunks) < len(rendered):
+        remaining -= add_chunks(remaining, allow_truncate=True)
+
+    parts = [system.strip()]
+    if used_chunks:
+        parts.append(_section(context_label, "\n---\n".join(used_chunks)))
+    if page_text:
+        parts.append(_section(page_label, page_text))
+    if selection_text:
+        parts.append(_section(selection_label, selection_text))
+    if instructions:
+        parts.append(instructions.strip())
+    prompt = "\n\n".join(p for p in parts if p)
+
+    context_tokens = sum(estimate_tokens(c) for c in used_chunks)
+    metrics = {
+        "budget": budget,
+        "total_tokens": estimate_tokens(prompt),
+        "fixed_tokens": fixed_tokens,
+        "selection_tokens": estimate_tokens(selection_text),
+        "page_tokens": estimate_tokens(page_text),
+        "context_tokens": context_tokens,
+        "context_chunks_used": len(used_chunks),
+        "context_chunks_dropped": len(rendered) - len(used_chunks),
+        "truncated": truncated,
+    }
+    logger.info("Prompt metrics: %s", metrics)
+    return prompt, metrics
@@ -0,0 +1,190 @@
+"""
+Token-bucket rate limiting per upstream, shared by all worker processes.
+
+Bucket state lives in a small SQLite file (RATE_LIMIT_PATH), updated in
+IMMEDIATE transactions, so every gunicorn worker draws from the same
+buckets. A caller waits for a token up to its deadline instead of sending
+a request the provider would throttle. A 429 empties the bucket until its
+Retry-After has passed, for every worker, and the request is retried while
+the deadline allows.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_PATH = os.getenv(
+    "RATE_LIMIT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".rate_limits.db"),
+)
+# upstream=requests_per_second:burst, comma-separated
+RATE_LIMITS = os.getenv(
+    "RATE_LIMITS",
+    "youcom=5:10,sanity_query=25:50,sanity_mutate=10:20,sanity_embeddings=5:10",
+)
+# Longest a request waits for a token (seconds) unless the caller says otherwise
+RATE_LIMIT_DEADLINE = float(os.getenv("RATE_LIMIT_DEADLINE", "10"))
+# Assumed back-off when a 429 has no usable Retry-After
+DEFAULT_RETRY_AFTER = 1.0
+MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    blocked_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+_local = threading.local()
+
+
+class RateLimitExceeded(requests.RequestException):
+    """No token became available before the deadline."""
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """'name=rate:burst,...' -> {name: (rate, burst)}; burst defaults to rate."""
+    limits = {}
+    for item in filter(None, (s.strip() for s in (spec or "").split(","))):
+        name, _, value = item.partition("=")
+        rate, _, burst = value.partition(":")
+        limits[name.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+LIMITS = parse_limits(RATE_LIMITS)
+
+
+def get_connection(path: str = RATE_LIMIT_PATH) -> Optional[sqlite3.Connection]:
+    """Per-thread connection to the bucket store, or None if it can't be opened."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    if path not in conns:
+        try:
+            # Autocommit mode; transactions are opened explicitly below
+            conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            conns[path] = conn
+        except sqlite3.Error as e:
+            logger.error(f"Rate limit store unavailable at {path}: {e}")
+            conns[path] = None
+    return conns[path]
+
+
+def _take(conn: sqlite3.Connection, name: str, rate: float, burst: float) -> float:
+    """Take one token if available. Returns 0 on success, else seconds to wait."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT tokens, updated, blocked_until FROM buckets WHERE name = ?", (name,)
+        ).fetchone()
+        tokens, updated, blocked_until = row if row else (burst, now, 0.0)
+        if now < blocked_until:
+            # Backing off after a 429: the bucket stays empty and starts
+            # refilling only when the back-off ends
+            conn.execute("COMMIT")
+            return blocked_until - now
+        tokens = min(burst, tokens + max(0.0, now - max(updated, blocked_until)) * rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / rate
+        conn.execute(
+            "INSERT OR REPLACE INTO buckets (name, tokens, updated, blocked_until) VALUES (?, ?, ?, ?)",
+            (name, tokens, now, blocked_until),
+        )
+        conn.execute("COMMIT")
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+    return wait
+
+
+def acquire(name: str, deadline: Optional[float] = None, path: str = RATE_LIMIT_PATH) -> bool:
+    """
+    Wait for a token from the `name` bucket for up to `deadline` seconds.
+    Returns False if none came in time. Unknown upstreams and an unavailable
+    store are not limited.
+    """
+    limit = LIMITS.get(name)
+    conn = get_connection(path) if limit else None
+    if conn is None:
+        return True
+    rate, burst = limit
+    give_up_at = time.time() + (RATE_LIMIT_DEADLINE if deadline is None else deadline)
+    while True:
+        try:
+            wait = _take(conn, name, rate, burst)
+        except sqlite3.Error as e:
+            logger.error(f"Rate limit check for {name} failed: {e}")
+            return True
+        if wait <= 0:
+            return True
+        if time.time() + wait > give_up_at:
+            return False
+        time.sleep(wait)
+
+
+def block(name: str, seconds: float, path: str = RATE_LIMIT_PATH):
+    """Empty the bucket and hold it for `seconds` (after a 429), for all workers."""
+    conn = get_connection(path)
+    if conn is None or name not in LIMITS:
+        return
+    now = time.time()
+    try:
+        conn.execute(
+            "INSERT INTO buckets (name, tokens, updated, blocked_until) VALUES (?, 0, ?, ?)"
+            " ON CONFLICT(name) DO UPDATE SET tokens = 0, updated = excluded.updated,"
+            " blocked_until = max(blocked_until, excluded.blocked_until)",
+            (name, now, now + seconds),
+        )
+    except sqlite3.Error as e:
+        logger.error(f"Could not record back-off for {name}: {e}")
+
+
+def retry_after_seconds(value: Optional[str]) -> float:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+def request(upstream: str, method: str, url: str, deadline: Optional[float] = None, **kwargs) -> requests.Response:
+    """
+    requests.request() behind the `upstream` bucket. Waits up to `deadline`
+    seconds in total for tokens and 429 back-offs; raises RateLimitExceeded
+    if that runs out. A final 429 is returned to the caller as is.
+    """
+    give_up_at = time.time() + (RATE_LIMIT_DEADLINE if deadline is None else deadline)
+    for attempt in range(MAX_ATTEMPTS):
+        if not acquire(upstream, max(0.0, give_up_at - time.time())):
+            raise RateLimitExceeded(f"{upstream}: no request slot within the deadline")
+        response = requests.request(method, url, **kwargs)
+        if response.status_code != 429:
+            return response
+        wait = retry_after_seconds(response.headers.get("Retry-After"))
+        block(upstream, wait)
+        logger.warning(f"{upstream} throttled (429); backing off {wait:.1f}s")
+        if attempt == MAX_ATTEMPTS - 1 or time.time() + wait > give_up_at:
+            return response
+    return response
@@ -1,104 +1,301 @@
 import os
+import json
 import requests
-from typing import List, Dict, Any
-from sanity import Client
+from typing import List, Dict, Any, Optional
 import logging
 
+try:
+    from .prompt_builder import format_context_chunk
+    from . import lexical_index, rate_limit
+    from .cache import MISSING, cached, get_cache, make_key
+except ImportError:
+    # Run as a script from socratic_questions/ (extract_pdf_pages.py)
+    from prompt_builder import format_context_chunk
+    import lexical_index
+    import rate_limit
+    from cache import MISSING, cached, get_cache, make_key
+
 logger = logging.getLogger(__name__)
 
 SANITY_PROJECT_ID = os.getenv("SANITY_PROJECT_ID", "s7ui9lek")
 SANITY_DATASET = os.getenv("SANITY_DATASET", "production")
 SANITY_TOKEN = os.getenv("SANITY_WRITE_TOKEN")
+SANITY_API_URL = os.getenv("SANITY_API_URL") or f"https://{SANITY_PROJECT_ID}.api.sanity.io"
+
+# Chunk-level index (pageChunk documents, see extract_pdf_pages.py)
+SANITY_EMBEDDINGS_INDEX = os.getenv("SANITY_EMBEDDINGS_INDEX", "textbook-chunks")
+# Legacy whole-page index, queried when the chunk index has no hits
+SANITY_PAGES_INDEX = os.getenv("SANITY_PAGES_INDEX", "textbook-pages")
+# Per-textbook shard indexes (one embeddings index per book, created by
+# extract_pdf_pages.py). Set to "" to always use the global index.
+SANITY_SHARD_INDEX_TEMPLATE = os.getenv("SANITY_SHARD_INDEX_TEMPLATE", "textbook-chunks-{textbook_id}")
+# Whether a book has a shard is remembered this long (seconds); misses for
+# less, so a newly extracted book's shard is picked up soon after
+SHARD_EXISTS_TTL = int(os.getenv("SANITY_SHARD_EXISTS_TTL", str(24 * 3600)))
+SHARD_MISSING_TTL = int(os.getenv("SANITY_SHARD_MISSING_TTL", "1800"))
+# When a book has no shard, over-fetch from the global index before filtering
+UNSCOPED_OVERFETCH = int(os.getenv("SANITY_UNSCOPED_OVERFETCH", "3"))
+# Whole pages are cut to this many chars; chunks are already size-bounded
+PAGE_SNIPPET_CHARS = 300
+# Give up on the remote index quickly; the local lexical index covers for it
+SANITY_EMBEDDINGS_TIMEOUT = float(os.getenv("SANITY_EMBEDDINGS_TIMEOUT", "5"))
+# Retrieved context is cached this long (seconds); re-uploads show up after it
+CONTEXT_CACHE_TTL = int(os.getenv("CONTEXT_CACHE_TTL", "3600"))
+
+def _query_index(query_text: str, index_name: str, top_k: int) -> List[Dict[str, Any]]:
+    """Raw embeddings index query; raises on HTTP errors (404: no such index)."""
+    url = f"{SANITY_API_URL}/vX/embeddings-index/query/{SANITY_DATASET}/{index_name}"
+    
+    headers = {
+        "Authorization": f"Bearer {SANITY_TOKEN}",
+        "Content-Type": "application/json"
+    }
+    
+    payload = {
+        "query": query_text,
+        "k": top_k
+    }
+    
+    # Don't queue longer than the request itself may take
+    response = rate_limit.request(
+        "sanity_embeddings", "POST", url, deadline=SANITY_EMBEDDINGS_TIMEOUT,
+        json=payload, headers=headers, timeout=SANITY_EMBEDDINGS_TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()
 
-# Initialize Sanity client
-sanity_client = Client(
-    logger,
-    project_id=SANITY_PROJECT_ID,
-    dataset=SANITY_DATASET,
-    token=SANITY_TOKEN,
-    use_cdn=False
-)
 
 def query_embeddings(
     query_text: str, 
-    index_name: str = "textbook-pages", 
+    index_name: str = SANITY_EMBEDDINGS_INDEX, 
     top_k: int = 3
 ) -> List[Dict[str, Any]]:
     """Query Sanity embeddings index for semantically similar content."""
+    try:
+        return _query_index(query_text, index_name, top_k)
+    except Exception as e:
+        logger.error(f"Error querying embeddings: {e}")
+        return []
+
+
+def shard_index_name(textbook_id: str) -> Optional[str]:
+    """Name of the per-textbook embeddings index, or None if sharding is off."""
+    if not SANITY_SHARD_INDEX_TEMPLATE or not textbook_id:
+        return None
+    return SANITY_SHARD_INDEX_TEMPLATE.format(textbook_id=textbook_id)
+
+
+def _shard_key(index_name: str) -> str:
+    return make_key("embeddings.shard", index_name)
+
+
+def shard_known(index_name: str):
+    """True/False if we know whether the shard exists, else MISSING."""
+    try:
+        return get_cache().get(_shard_key(index_name))
+    except Exception as e:
+        logger.warning(f"Cache read failed for shard {index_name}: {e}")
+        return MISSING
+
+
+def remember_shard(index_name: str, exists: bool):
+    """Record (for every worker) whether a shard index exists."""
+    try:
+        get_cache().set(_shard_key(index_name), exists, SHARD_EXISTS_TTL if exists else SHARD_MISSING_TTL)
+    except Exception as e:
+        logger.warning(f"Cache write failed for shard {index_name}: {e}")
+
+
+def create_textbook_index(textbook_id: str) -> bool:
+    """
+    Create the shard embeddings index for one textbook's chunks.
+    Returns True if created (or it already exists).
+    """
+    index_name = shard_index_name(textbook_id)
+    if not index_name:
+        return False
     
-    url = f"https://{SANITY_PROJECT_ID}.api.sanity.io/vX/embeddings-index/query/{SANITY_DATASET}/{index_name}"
-    
+    url = f"{SANITY_API_URL}/vX/embeddings-index/{SANITY_DATASET}"
     headers = {
         "Authorization": f"Bearer {SANITY_TOKEN}",
         "Content-Type": "application/json"
     }
-    
     payload = {
-        "query": query_text,
-        "k": top_k
+        "indexName": index_name,
+        "dataset": SANITY_DATASET,
+        "filter": f'_type == "pageChunk" && textbook._ref == {json.dumps(textbook_id)}',
+        "projection": "{content, pageNumber}",
     }
     
     try:
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        response = rate_limit.request(
+            "sanity_embeddings", "POST", url, json=payload, headers=headers, timeout=30
+        )
+        if response.status_code != 409:
+            response.raise_for_status()
+        remember_shard(index_name, True)
+        return True
     except Exception as e:
-        logger.error(f"Error querying embeddings: {e}")
+        logger.error(f"Error creating embeddings index {index_name}: {e}")
+        return False
+
+
+def fetch_context_documents(doc_ids: List[str], textbook_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch chunk/page documents for embedding hits in a single GROQ query.
+    With textbook_id, documents from other textbooks are never fetched.
+    """
+    if not doc_ids:
         return []
+    scope = f" && textbook._ref == {json.dumps(textbook_id)}" if textbook_id else ""
+    groq = (
+        f'*[_id in {json.dumps(doc_ids)}{scope}]{{'
+        f'  _id, _type, pageNumber, chunkIndex, charStart, content, '
+        f'  "textbookTitle": textbook->title'
+        f'}}'
+    )
+    response = rate_limit.request(
+        "sanity_query",
+        "GET",
+        f"{SANITY_API_URL}/v2021-06-07/data/query/{SANITY_DATASET}",
+        deadline=SANITY_EMBEDDINGS_TIMEOUT,
+        params={"query": groq},
+        headers={"Authorization": f"Bearer {SANITY_TOKEN}"},
+        timeout=SANITY_EMBEDDINGS_TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json().get("result") or []
 
 
-def get_textbook_context(query: str, top_k: int = 3) -> str:
+def query_scoped_embeddings(
+    query_text: str,
+    textbook_id: Optional[str] = None,
+    top_k: int = 3,
+) -> List[Dict[str, Any]]:
+    """
+    Query embeddings for one textbook: its shard index if it has one,
+    otherwise the global chunk index (then the legacy page index) with
+    over-fetch so enough hits survive the textbook filter.
     """
-    Get relevant context from textbook pages using semantic search.
+    shard = shard_index_name(textbook_id)
+    # Only books extracted by the CLI have a shard; a known miss skips the
+    # query (and its rate-limit token) entirely
+    known = shard_known(shard) if shard else False
+    if known is not False:
+        try:
+            results = _query_index(query_text, shard, top_k)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                remember_shard(shard, False)
+            else:
+                logger.error(f"Error querying embeddings shard {shard}: {e}")
+            results = []
+        except Exception as e:
+            logger.error(f"Error querying embeddings shard {shard}: {e}")
+            results = []
+        else:
+            if known is MISSING:
+                remember_shard(shard, True)
+        if results:
+            return results
+    
+    k = top_k * UNSCOPED_OVERFETCH if textbook_id else top_k
+    results = query_embeddings(query_text, top_k=k)
+    if not results and SANITY_PAGES_INDEX and SANITY_PAGES_INDEX != SANITY_EMBEDDINGS_INDEX:
+        results = query_embeddings(query_text, index_name=SANITY_PAGES_INDEX, top_k=k)
+    return results
+
+
+# Only blended (embeddings + BM25) results are cached; a lexical-only
+# fallback while embeddings are down must not outlive the outage
+@cached("textbook.context", ttl=CONTEXT_CACHE_TTL, should_cache=lambda result: result[1] and bool(result[0]))
+def _context_chunks(query: str, top_k: int, textbook_id: Optional[str]) -> tuple[List[Dict[str, Any]], bool]:
+    """(chunks, whether embeddings contributed) for get_textbook_context_chunks()."""
+    # Local BM25 hits: sub-millisecond, used for re-ranking and as fallback
+    lexical = lexical_index.search(query, top_k=top_k * 2, textbook_id=textbook_id)
+    
+    # Query the chunk index, falling back to whole pages for older uploads
+    results = query_scoped_embeddings(query, textbook_id=textbook_id, top_k=top_k)
+    
+    if not results:
+        if lexical:
+            logger.info("Embeddings returned nothing; using lexical index hits")
+        return lexical_index.lexical_only(lexical, top_k), False
+    
+    scores = {}
+    for hit in results:
+        doc_id = hit.get("value", {}).get("documentId")
+        if doc_id:
+            scores[doc_id] = max(scores.get(doc_id, 0), hit.get("score", 0))
+    
+    try:
+        docs = fetch_context_documents(list(scores), textbook_id=textbook_id)
+    except Exception as e:
+        logger.error(f"Error fetching context documents {list(scores)}: {e}")
+        return lexical_index.lexical_only(lexical, top_k), False
+    
+    chunks = []
+    for doc in docs:
+        content = doc.get("content") or ""
+        if doc.get("_type") == "page" and len(content) > PAGE_SNIPPET_CHARS:
+            # Legacy page hit: include a snippet of the actual content
+            content = content[:PAGE_SNIPPET_CHARS] + "..."
+        
+        chunks.append({
+            "document_id": doc["_id"],
+            "page_number": doc.get("pageNumber", "?"),
+            "chunk_index": doc.get("chunkIndex"),
+            "char_start": doc.get("charStart"),
+            "textbook_title": doc.get("textbookTitle") or "Unknown",
+            "score": scores.get(doc["_id"], 0),
+            "content": content,
+        })
+    
+    chunks.sort(key=lambda c: c["score"], reverse=True)
+    return lexical_index.hybrid_rerank(chunks, lexical, top_k), True
+
+
+def get_textbook_context_chunks(
+    query: str,
+    top_k: int = 3,
+    textbook_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Get relevant textbook passages as structured chunks, highest score first.
+    With textbook_id, only that textbook is searched.
+
+    Returns:
+        [{"document_id", "page_number", "chunk_index", "char_start",
+          "textbook_title", "score", "content"}]
+    """
+    return _context_chunks(query, top_k, textbook_id)[0]
+
+
+def cached_context_chunks(query: str, top_k: int = 3, textbook_id: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """The cached chunks for a query, or None; never queries an index."""
+    try:
+        value = get_cache().get(make_key("textbook.context", query, top_k, textbook_id))
+    except Exception as e:
+        logger.warning(f"Cache read failed for textbook.context: {e}")
+        return None
+    return None if value is MISSING else value[0]
+
+
+def get_textbook_context(query: str, top_k: int = 3, textbook_id: Optional[str] = None) -> str:
+    """
+    Get relevant context from textbook chunks using semantic search.
     
     Args:
         query: The concept or question to search for
         top_k: Number of results to retrieve (default: 3)
+        textbook_id: Restrict the search to this textbook (default: all)
         
     Returns:
         String containing relevant page content with page numbers
     """
-    # Query embeddings
-    results = query_embeddings(query, top_k=top_k)
+    chunks = get_textbook_context_chunks(query, top_k=top_k, textbook_id=textbook_id)
     
-    if not results:
+    if not chunks:
         return "No relevant context found in textbooks."
     
-    # Fetch actual page documents using the IDs
-    context_parts = []
-    for i, hit in enumerate(results, 1):
-        doc_id = hit.get("value", {}).get("documentId")
-        score = hit.get("score", 0)
-        
-        if not doc_id:
-            continue
-        
-        # Fetch the page document from Sanity
-        try:
-            doc = sanity_client.query(
-                f'*[_id == "{doc_id}"][0]{{'
-                f'  title, pageNumber, content, '
-                f'  "textbookTitle": textbook->title'
-                f'}}'
-            )
-            
-            if doc:
-                result = doc.get("result", {})
-                page_num = result.get("pageNumber", "?")
-                textbook_title = result.get("textbookTitle", "Unknown")
-                content = result.get("content", "")
-                
-                # Include a snippet of the actual content (first 300 chars)
-                content_snippet = content[:300] + "..." if len(content) > 300 else content
-                
-                context_parts.append(
-                    f"[Page {page_num} from '{textbook_title}' (relevance: {score:.2f})]\n"
-                    f"{content_snippet}\n"
-                )
-        except Exception as e:
-            logger.error(f"Error fetching page {doc_id}: {e}")
-    
-    if not context_parts:
-        return "Could not retrieve textbook content."
-    
-    return "\n---\n".join(context_parts)
\ No newline at end of file
+    return "\n---\n".join(format_context_chunk(c) for c in chunks)
\ No newline at end of file
@@ -1,5 +1,5 @@
 # Sanity DB Schema for sending and receiving data
-from typing import TypedDict, Optional
+from typing import TypedDict, Optional, List
 
 class QuestionState(TypedDict):
     """
@@ -11,6 +11,8 @@ class QuestionState(TypedDict):
     textbook_id: Optional[str]  #identifying textbook
     page_content: Optional[str]  #getting current page text
     pdf_context: Optional[str]  #Broader context from embeddings
+    pdf_context_chunks: Optional[List[dict]]  #Scored chunks behind pdf_context
+    prompt_metrics: Optional[dict]  #Token usage of the generation prompt
     user_answer: str
     user_confidence: str  
     socratic_question: str
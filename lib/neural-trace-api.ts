@@ -15,17 +15,49 @@ import type {
 
 const API_BASE = "/api";
 
+// Last ETag and body per request, so repeats revalidate with If-None-Match
+// (browsers only do this on their own for GET). Only responses with an
+// ETag are kept (no-store routes such as /answer/submit send none), least
+// recently used first out once ETAG_CACHE_MAX is reached.
+const ETAG_CACHE_MAX = 32;
+const etagCache = new Map<string, { etag: string; data: unknown }>();
+
 async function post<T>(path: string, body: object): Promise<T> {
+  const json = JSON.stringify(body);
+  const key = `${path} ${json}`;
+  const cached = etagCache.get(key);
+  if (cached) {
+    // Map keeps insertion order: re-insert to mark as recently used
+    etagCache.delete(key);
+    etagCache.set(key, cached);
+  }
   const res = await fetch(`${API_BASE}${path}`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(body),
+    headers: {
+      "Content-Type": "application/json",
+      ...(cached ? { "If-None-Match": cached.etag } : {}),
+    },
+    body: json,
   });
+  if (res.status === 304 && cached) {
+    return cached.data as T;
+  }
   if (!res.ok) {
     const text = await res.text();
     throw new Error(`API ${path}: ${res.status} ${text}`);
   }
-  return res.json() as Promise<T>;
+  const data = await res.json();
+  const etag = res.headers.get("ETag");
+  if (etag) {
+    etagCache.delete(key);
+    etagCache.set(key, { etag, data });
+    if (etagCache.size > ETAG_CACHE_MAX) {
+      etagCache.delete(etagCache.keys().next().value as string);
+    }
+  } else {
+    etagCache.delete(key);
+  }
+  return data as T;
 }
 
 /**
@@ -5,6 +5,7 @@ import { masteryType } from "./masteryType";
 import { userType } from "./userType";
 import { folderType } from "./folderType";
 import { pageType } from './pageType'
+import { pageChunkType } from "./pageChunkType";
 
 export const schemaTypes = [
   neuronType,
@@ -14,4 +15,5 @@ export const schemaTypes = [
   userType,
   folderType,
   pageType,
+  pageChunkType,
 ];
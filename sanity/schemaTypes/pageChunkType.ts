@@ -0,0 +1,54 @@
+import { defineField, defineType } from "sanity";
+
+export const pageChunkType = defineType({
+  name: "pageChunk",
+  title: "Textbook Page Chunk",
+  type: "document",
+  fields: [
+    defineField({
+      name: "textbook",
+      title: "Textbook",
+      type: "reference",
+      to: [{ type: "textbook" }],
+      validation: (Rule) => Rule.required(),
+    }),
+    defineField({
+      name: "page",
+      title: "Page",
+      type: "reference",
+      to: [{ type: "page" }],
+      validation: (Rule) => Rule.required(),
+    }),
+    defineField({
+      name: "pageNumber",
+      title: "Page Number",
+      type: "number",
+      validation: (Rule) => Rule.required().min(1),
+    }),
+    defineField({
+      name: "chunkIndex",
+      title: "Chunk Index",
+      type: "number",
+      description: "Position of this chunk within its page (0-based)",
+      validation: (Rule) => Rule.required().min(0),
+    }),
+    defineField({
+      name: "charStart",
+      title: "Start Offset",
+      type: "number",
+      description: "Character offset of the chunk in the page text",
+    }),
+    defineField({
+      name: "charEnd",
+      title: "End Offset",
+      type: "number",
+      description: "Character offset just past the chunk in the page text",
+    }),
+    defineField({
+      name: "content",
+      title: "Chunk Content (Text)",
+      type: "text",
+      description: "Overlapping, size-bounded slice of the page text",
+    }),
+  ],
+});
@@ -46,6 +46,13 @@ export const socraticType = defineType({
       type: "number",
       validation: (Rule) => Rule.min(1).max(5).integer(),
     }),
+    defineField({
+      name: "answerScore",
+      title: "Answer Score (0-1)",
+      type: "number",
+      description: "Local overlap/similarity score of the answer against the passage",
+      validation: (Rule) => Rule.min(0).max(1),
+    }),
     defineField({
       name: "resources",
       title: "Learning Resources",